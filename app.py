@@ -1,23 +1,29 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
+import json
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(__file__))
 
 from backend.config_loader import config
-from backend.searcher import search_papers
-from backend.ranker import rank_papers
-from backend.fetcher import fetch_paper
-from backend.extractor import extract_text
-from backend.multi_summarizer import summarize_multiple_papers
-from backend.report_generator import generate_report_pdf
+from backend.jobs import JobManager, JobQueueFull
+from backend import metrics
+from backend.pipeline import generate_report, request_overrides
 
 app = FastAPI(title="Composer AI")
 
+jobs = JobManager(
+    max_workers=config.get("jobs", "max_workers"),
+    max_queue=config.get("jobs", "max_queue")
+)
+
+metrics.gauge("composer_jobs", "Retained report jobs by status.", ("status",), jobs.status_counts)
+
 app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
 
 class ConfigUpdate(BaseModel):
@@ -34,16 +40,19 @@ async def read_root():
 
 @app.get("/api/config")
 async def get_config():
+    data = config.to_dict()
     return {
-        "llm": config.data["llm"],
-        "embeddings": config.data["embeddings"],
-        "indexer": config.data["indexer"],
-        "search": config.data["search"],
-        "output": config.data["output"]
+        "llm": data["llm"],
+        "embeddings": data["embeddings"],
+        "indexer": data["indexer"],
+        "search": data["search"],
+        "output": data["output"]
     }
 
 @app.post("/api/config")
 async def update_config(updates: ConfigUpdate):
+    # Admin action: changes the defaults for new requests and saves config.yaml.
+    # Per-report settings go in the report request instead.
     config_updates = {}
     
     if updates.llm_model:
@@ -59,8 +68,8 @@ async def update_config(updates: ConfigUpdate):
             config_updates["search"] = {}
         config_updates["search"]["max_results"] = updates.max_results
     
-    config.update(config_updates)
-    return {"status": "success", "config": config.data}
+    await run_in_threadpool(config.save, config_updates)
+    return {"status": "success", "config": config.to_dict()}
 
 @app.post("/api/process-query")
 async def process_query(request: dict):
@@ -71,8 +80,11 @@ async def process_query(request: dict):
         if not user_input:
             raise HTTPException(status_code=400, detail="Query is required")
         
-        query_spec = process_user_query(user_input)
+        cfg = config.snapshot(request_overrides(request))
+        query_spec = await run_in_threadpool(process_user_query, user_input, cfg)
         return query_spec
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -80,117 +92,64 @@ async def process_query(request: dict):
 
 @app.post("/api/generate-advanced")
 async def generate_advanced_report(request: dict):
+    # Same queue and limits as /api/jobs; this endpoint just waits for the result
+    if not request.get("user_query"):
+        raise HTTPException(status_code=400, detail="User query is required")
     try:
-        from backend.query_processor import process_user_query
-        
-        user_query = request.get("user_query", "")
-        if not user_query:
-            raise HTTPException(status_code=400, detail="User query is required")
-        
-        # Apply runtime config updates if provided
-        if request.get("llm_model"):
-            config.update({"llm": {"model": request["llm_model"]}})
-        if request.get("embedding_model"):
-            config.update({"embeddings": {"model": request["embedding_model"]}})
-        if request.get("indexer_type"):
-            config.update({"indexer": {"type": request["indexer_type"]}})
-        if request.get("top_papers"):
-            config.update({"search": {"top_papers": request["top_papers"]}})
-        
-        query_spec = process_user_query(user_query)
-        
-        search_query = query_spec.get("search_query", user_query)
-        
-        os.makedirs("data/papers", exist_ok=True)
-        os.makedirs("data/outputs", exist_ok=True)
-        
-        papers = search_papers(search_query)
-        
-        if not papers:
-            raise HTTPException(status_code=404, detail=f"No papers found for query: {search_query}")
-        
-        # Get top_papers from config (which may have been updated above)
-        top_n = config.get("search", "top_papers")
-        top_papers = rank_papers(papers, search_query)[:top_n]
-        
-        # Return progress info including all papers and their status
-        progress_info = {
-            "total_papers": len(top_papers),
-            "papers_list": [{"title": p["title"], "arxiv_id": p["arxiv_id"]} for p in top_papers]
-        }
-        
-        papers_data = []
-        errors = []
-        processed_papers = []
-        
-        for idx, paper in enumerate(top_papers, 1):
-            arxiv_id = paper['arxiv_id']
-            try:
-                pdf_path = fetch_paper(arxiv_id)
-                text, metadata = extract_text(pdf_path)
-                papers_data.append({
-                    'text': text,
-                    'metadata': metadata
-                })
-                processed_papers.append({
-                    "index": idx,
-                    "title": paper["title"],
-                    "arxiv_id": arxiv_id,
-                    "status": "success"
-                })
-            except Exception as e:
-                error_msg = f"Failed to process {arxiv_id}: {str(e)}"
-                errors.append(error_msg)
-                processed_papers.append({
-                    "index": idx,
-                    "title": paper["title"],
-                    "arxiv_id": arxiv_id,
-                    "status": "error",
-                    "error": str(e)
-                })
+        job = jobs.submit(generate_report, request)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    await job.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=job.status_code, detail=job.error)
+    return job.result
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: dict):
+    if not request.get("user_query"):
+        raise HTTPException(status_code=400, detail="User query is required")
+    try:
+        job = jobs.submit(generate_report, request)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.summary()
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Each event's id is its index, so a reconnecting EventSource resumes after the last one it saw
+    try:
+        cursor = max(0, int(request.headers.get("Last-Event-ID", -1)) + 1)
+    except ValueError:
+        cursor = 0
+    
+    async def event_stream(cursor):
+        while True:
+            events = await job.next_events(cursor, 15)
+            if not events:
+                if job.finished():
+                    break
+                yield ": keep-alive\n\n"
                 continue
-        
-        if not papers_data:
-            raise HTTPException(status_code=500, detail=f"Failed to fetch any papers. Errors: {'; '.join(errors)}")
-        
-        report = summarize_multiple_papers(papers_data, search_query, query_spec)
-        
-        topic_slug = search_query.replace(' ', '_')[:50]
-        output_filename = f"{topic_slug}_report.pdf"
-        output_path = f"data/outputs/{output_filename}"
-        generate_report_pdf(report, top_papers, search_query, output_path)
-        
-        # Create a text preview by removing LaTeX commands
-        import re
-        preview = report
-        preview = re.sub(r'\\begin\{abstract\}', '', preview)
-        preview = re.sub(r'\\end\{abstract\}', '', preview)
-        preview = re.sub(r'\\section\{([^}]+)\}', r'\n\n═══ \1 ═══\n', preview)
-        preview = re.sub(r'\\subsection\{([^}]+)\}', r'\n── \1 ──\n', preview)
-        preview = re.sub(r'\\cite\{([^}]+)\}', r'[\1]', preview)
-        preview = re.sub(r'\\textbf\{([^}]+)\}', r'\1', preview)
-        preview = re.sub(r'\\textit\{([^}]+)\}', r'\1', preview)
-        preview = re.sub(r'\\[a-zA-Z]+\{([^}]+)\}', r'\1', preview)
-        preview = re.sub(r'\\[a-zA-Z]+', '', preview)
-        preview = preview.strip()
-        
-        return {
-            "status": "success",
-            "filename": output_filename,
-            "papers": [{"title": p["title"], "arxiv_id": p["arxiv_id"]} for p in top_papers],
-            "processed_papers": processed_papers,
-            "query_spec": query_spec,
-            "report_preview": preview[:8000],  # Limit preview size
-            "warnings": errors if errors else None,
-            "progress_info": progress_info
-        }
+            for offset, event in enumerate(events):
+                yield f"id: {cursor + offset}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            cursor += len(events)
     
-    except HTTPException:
-        raise
-    except Exception as e:
-        import traceback
-        detail = f"{str(e)}\n\nTraceback: {traceback.format_exc()}"
-        raise HTTPException(status_code=500, detail=detail)
+    return StreamingResponse(
+        event_stream(cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/download/{filename}")
 async def download_file(filename: str):
@@ -199,10 +158,15 @@ async def download_file(filename: str):
         raise HTTPException(status_code=404, detail="File not found")
     return FileResponse(file_path, filename=filename)
 
+@app.get("/api/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/models")
 async def get_models():
     return {
         "llm_models": ["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"],
-        "indexer_types": ["vector", "bm25", "tfidf", "inverted"],
+        "indexer_types": ["vector", "bm25", "tfidf", "inverted", "hybrid"],
         "embedding_models": ["text-embedding-3-small", "text-embedding-3-large", "text-embedding-ada-002"]
     }
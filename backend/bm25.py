@@ -0,0 +1,171 @@
+import os
+import uuid
+from collections import Counter
+from itertools import islice
+import numpy as np
+from scipy import sparse
+from .lexical import tokenize
+
+class BM25Index:
+    """Okapi BM25 over a sparse CSR term-document matrix.
+
+    Term frequencies are kept as a CSR matrix, from which IDF and the
+    length-normalized term weights are precomputed whenever documents are
+    added. A batch of queries is then scored with one sparse matrix product.
+    IDF follows rank_bm25's BM25Okapi, including the epsilon floor for
+    negative values.
+
+    Saving appends the rows and vocabulary terms added since the last save
+    as a new block directory; dropping rows rewrites the index as one block.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, epsilon=0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocab = {}
+        self.term_freqs = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.weights = self.term_freqs
+        self.blocks = []
+        self.saved_rows = 0
+        self.saved_terms = 0
+
+    def __len__(self):
+        return self.term_freqs.shape[0]
+
+    def add_documents(self, tokenized_docs):
+        """Append documents (lists of tokens) and refresh the statistics."""
+        data = []
+        indices = []
+        indptr = [0]
+        for tokens in tokenized_docs:
+            for term, count in Counter(tokens).items():
+                indices.append(self.vocab.setdefault(term, len(self.vocab)))
+                data.append(count)
+            indptr.append(len(indices))
+
+        n_terms = len(self.vocab)
+        new_rows = sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, n_terms)
+        )
+        old = self.term_freqs
+        old = sparse.csr_matrix((old.data, old.indices, old.indptr), shape=(old.shape[0], n_terms))
+        self.term_freqs = sparse.vstack([old, new_rows], format='csr')
+        self._update_statistics()
+
+    def keep_rows(self, rows):
+        """Keep only the given documents, renumbered in that order, and drop unused terms."""
+        tf = self.term_freqs[np.asarray(rows, dtype=np.int64)]
+        used = np.flatnonzero(np.bincount(tf.indices, minlength=tf.shape[1]))
+        remap = np.full(tf.shape[1], -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        self.vocab = {term: int(remap[col]) for term, col in self.vocab.items() if remap[col] >= 0}
+        self.term_freqs = sparse.csr_matrix(
+            (tf.data, remap[tf.indices].astype(np.int32), tf.indptr), shape=(tf.shape[0], len(used))
+        )
+        self._update_statistics()
+        # Columns were renumbered, so saved blocks no longer apply
+        self.blocks = []
+        self.saved_rows = 0
+        self.saved_terms = 0
+
+    def _update_statistics(self):
+        tf = self.term_freqs
+        n_docs, n_terms = tf.shape
+
+        doc_freqs = np.bincount(tf.indices, minlength=n_terms)
+        idf = np.log(n_docs - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+        if n_terms:
+            idf[idf < 0] = self.epsilon * idf.mean()
+        self.idf = idf.astype(np.float32)
+
+        doc_lengths = np.asarray(tf.sum(axis=1)).ravel()
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / (avg_length or 1.0))
+
+        rows = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+        weights = tf.data * (self.k1 + 1) / (tf.data + length_norm[rows])
+        self.weights = sparse.csr_matrix(
+            (weights.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape
+        )
+
+    def query_matrix(self, tokenized_queries):
+        """IDF-weighted (n_queries, n_terms) matrix; repeated terms count repeatedly."""
+        rows = []
+        cols = []
+        for row, tokens in enumerate(tokenized_queries):
+            for term in tokens:
+                col = self.vocab.get(term)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(tokenized_queries), len(self.vocab))
+        )
+        return counts.multiply(self.idf).tocsr()
+
+    def score(self, tokenized_queries, rows=None):
+        """Dense (n_queries, n_docs) BM25 scores for a batch of queries.
+
+        With ``rows``, only those documents are scored, and column j holds
+        the score of document rows[j].
+        """
+        weights = self.weights if rows is None else self.weights[np.asarray(rows, dtype=np.int64)]
+        if not weights.shape[0]:
+            return np.zeros((len(tokenized_queries), 0), dtype=np.float32)
+        return (self.query_matrix(tokenized_queries) @ weights.T).toarray()
+
+    def save(self, path):
+        """Write rows and terms added since the last save as a block and return the info open needs.
+
+        ``info['files']`` lists the block directories in use; others under
+        path are left for the caller to delete once it has recorded the info.
+        """
+        if self.saved_rows < len(self) or not self.blocks:
+            name = f"block-{uuid.uuid4().hex}"
+            block_path = os.path.join(path, name)
+            os.makedirs(block_path, exist_ok=True)
+            tf = self.term_freqs[self.saved_rows:]
+            terms = np.array(list(islice(self.vocab, self.saved_terms, None)), dtype=str)
+            np.save(os.path.join(block_path, 'data.npy'), tf.data)
+            np.save(os.path.join(block_path, 'indices.npy'), tf.indices)
+            np.save(os.path.join(block_path, 'indptr.npy'), tf.indptr)
+            np.save(os.path.join(block_path, 'terms.npy'), terms)
+            self.blocks.append(name)
+            self.saved_rows = len(self)
+            self.saved_terms = len(self.vocab)
+        return {'files': list(self.blocks)}
+
+    @classmethod
+    def open(cls, path, info):
+        index = cls()
+        terms = []
+        blocks = []
+        for name in info['files']:
+            block_path = os.path.join(path, name)
+            terms.extend(np.load(os.path.join(block_path, 'terms.npy')).tolist())
+            blocks.append((
+                np.load(os.path.join(block_path, 'data.npy')),
+                np.load(os.path.join(block_path, 'indices.npy')),
+                np.load(os.path.join(block_path, 'indptr.npy'))
+            ))
+        index.vocab = {term: col for col, term in enumerate(terms)}
+        if blocks:
+            # A block's columns only reach the terms known when it was saved
+            index.term_freqs = sparse.vstack([
+                sparse.csr_matrix(block, shape=(len(block[2]) - 1, len(terms))) for block in blocks
+            ], format='csr')
+        index._update_statistics()
+        index.blocks = list(info['files'])
+        index.saved_rows = len(index)
+        index.saved_terms = len(terms)
+        return index
+
+def bm25_scores(documents, query):
+    """BM25 score of each document for a single query, built ad hoc."""
+    index = BM25Index()
+    index.add_documents(tokenize(doc) for doc in documents)
+    return index.score([tokenize(query)])[0]
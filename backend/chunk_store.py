@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .config_loader import config
+from .extractor import clean_text
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+class PaperChunks:
+    """One paper's cleaned text, with its chunks stored as (start, end) offsets."""
+
+    __slots__ = ('arxiv_id', 'title', 'text', 'starts', 'ends')
+
+    def __init__(self, arxiv_id, title, text, starts, ends):
+        self.arxiv_id = arxiv_id
+        self.title = title
+        self.text = text
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.ends = np.asarray(ends, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def chunk_text(self, i):
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def iter_texts(self):
+        for i in range(len(self)):
+            yield self.chunk_text(i)
+
+    def chunk_metadata(self, i):
+        """Paper metadata plus the chunk's character offsets in the paper text."""
+        return {
+            'title': self.title,
+            'arxiv_id': self.arxiv_id,
+            'start': int(self.starts[i]),
+            'end': int(self.ends[i])
+        }
+
+    def to_dict(self):
+        """JSON-ready fields; PaperChunks(**paper.to_dict()) rebuilds the paper."""
+        return {
+            'arxiv_id': self.arxiv_id,
+            'title': self.title,
+            'text': self.text,
+            'starts': self.starts.tolist(),
+            'ends': self.ends.tolist()
+        }
+
+    def chunk_doc(self, i):
+        return {
+            'page_content': self.chunk_text(i),
+            'metadata': self.chunk_metadata(i)
+        }
+
+class ChunkStore:
+    """Cleaned, chunked paper texts shared by all indexers with the same chunking.
+
+    Each paper's text is cleaned and split once, and a chunk is a slice of
+    it. At most ``max_papers`` papers stay resident; the least recently
+    requested are dropped first. Indexers hold their own references to the
+    papers they index, so a paper dropped here stays readable until they
+    evict it too.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=200, max_papers=1000):
+        self.chunk_overlap = chunk_overlap
+        self.max_papers = max_papers
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        self.lock = threading.RLock()
+        self.papers = OrderedDict()
+
+    def __len__(self):
+        return len(self.papers)
+
+    def _split_offsets(self, text):
+        """Chunk boundaries of text, located the same way add_start_index does."""
+        starts = []
+        ends = []
+        index = 0
+        previous_length = 0
+        for chunk in self.text_splitter.split_text(text):
+            offset = index + previous_length - self.chunk_overlap
+            index = text.find(chunk, max(0, offset))
+            starts.append(index)
+            ends.append(index + len(chunk))
+            previous_length = len(chunk)
+        return starts, ends
+
+    def add_papers(self, papers_data):
+        """Chunk papers that are not in the store yet and return all of them, in order."""
+        with self.lock:
+            papers = []
+            for paper_data in papers_data:
+                metadata = paper_data['metadata']
+                arxiv_id = metadata['arxiv_id']
+                paper = self.papers.get(arxiv_id)
+                if paper is None:
+                    text = clean_text(paper_data['text'] or '').strip()
+                    starts, ends = self._split_offsets(text)
+                    paper = PaperChunks(arxiv_id, clean_text(metadata['title']).strip(), text, starts, ends)
+                    self.papers[arxiv_id] = paper
+                self.papers.move_to_end(arxiv_id)
+                papers.append(paper)
+
+            while len(self.papers) > self.max_papers:
+                self.papers.popitem(last=False)
+            return papers
+
+def get_chunk_store(chunk_size=1000, chunk_overlap=200):
+    key = (chunk_size, chunk_overlap)
+    with _stores_lock:
+        if key not in _stores:
+            # Memory bounds are process-wide, so they come from the base config
+            _stores[key] = ChunkStore(chunk_size, chunk_overlap, config.get('indexer', 'max_resident_papers'))
+        return _stores[key]
@@ -0,0 +1,167 @@
+import threading
+import time
+import arxiv
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from .config_loader import config
+from .metrics import RETRIES
+
+# Buckets hold this many seconds' worth of capacity, bounding bursts
+BURST_SECONDS = 10
+
+class TokenBucket:
+    """Thread-safe token bucket that serves callers in arrival order.
+
+    ``acquire`` reserves its tokens immediately, letting the balance go
+    negative, then sleeps until the refill covers the reservation. Later
+    callers queue behind earlier ones instead of racing them, so jobs that
+    share a bucket share its rate fairly.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Take amount tokens, blocking until they are available; returns the wait in seconds."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold back every caller for at least seconds, e.g. after an HTTP 429."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+# Fail at import rather than silently skipping the scheduling if the hook goes away
+if not hasattr(arxiv.Client, '_parse_feed'):
+    raise Exception(f"arxiv {getattr(arxiv, '__version__', '?')} has no Client._parse_feed to schedule; install arxiv 4.0.x")
+
+class ScheduledArxivClient(arxiv.Client):
+    """arxiv.Client whose page requests (and retries) go through a shared bucket.
+
+    The library's own per-instance delay is disabled; spacing is enforced by
+    the bucket, which all jobs share. This hooks arxiv.Client._parse_feed,
+    a private method, so requirements.txt pins arxiv to the 4.0 series.
+    """
+
+    def __init__(self, bucket, **kwargs):
+        super().__init__(delay_seconds=0, **kwargs)
+        self.bucket = bucket
+
+    def _parse_feed(self, url, first_page=True, _try_index=0):
+        if _try_index:
+            RETRIES.inc(target='arxiv')
+        self.bucket.acquire()
+        return super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
+
+_lock = threading.RLock()
+_buckets = {}
+_clients = {}
+
+def _bucket(name, rate, capacity):
+    with _lock:
+        if name not in _buckets:
+            _buckets[name] = TokenBucket(rate, capacity)
+        return _buckets[name]
+
+def _client(key, factory):
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+def arxiv_bucket():
+    # arXiv asks for no more than one API request every few seconds, without bursts
+    return _bucket('arxiv', 1 / config.get('clients', 'arxiv_interval_s'), 1)
+
+def download_bucket():
+    rps = config.get('clients', 'download_rps')
+    return _bucket('download', rps, max(1, rps))
+
+def openai_buckets(model):
+    """(requests, tokens) buckets for a model, refilled per second from RPM/TPM limits."""
+    rpm = config.get('clients', 'openai_rpm')
+    tpm = config.get('clients', 'openai_tpm')
+    return (
+        _bucket(('openai_rpm', model), rpm / 60, max(1, rpm / 60 * BURST_SECONDS)),
+        _bucket(('openai_tpm', model), tpm / 60, tpm / 60 * BURST_SECONDS)
+    )
+
+def estimate_tokens(texts):
+    # Characters / 4, the same rough estimate the provider's limiter uses
+    return sum(len(text) for text in texts) // 4 + 1
+
+def throttle_openai(model, texts):
+    """Block until one request carrying texts fits within the model's RPM and TPM.
+
+    Returns the estimated token count charged to the bucket.
+    """
+    requests_bucket, tokens_bucket = openai_buckets(model)
+    requests_bucket.acquire()
+    tokens = estimate_tokens(texts)
+    tokens_bucket.acquire(tokens)
+    return tokens
+
+def pause_openai(model, seconds):
+    """Back off every caller of a model after it reported a rate limit."""
+    for bucket in openai_buckets(model):
+        bucket.pause(seconds)
+
+def _http_session():
+    pool_size = config.get('clients', 'http_pool_size')
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+_factories = {
+    'arxiv': lambda: ScheduledArxivClient(arxiv_bucket()),
+    'http': _http_session,
+    'chat': lambda model, temperature, max_retries: ChatOpenAI(
+        model=model, temperature=temperature, max_retries=max_retries
+    ),
+    'embeddings': lambda model: OpenAIEmbeddings(model=model)
+}
+
+def set_factory(kind, factory):
+    """Replace how one kind of client is built, e.g. with offline stand-ins.
+
+    Clients of that kind that were already built are dropped.
+    """
+    if kind not in _factories:
+        raise ValueError(f"Unknown client kind: {kind}")
+    with _lock:
+        _factories[kind] = factory
+        for key in [k for k in _clients if k == kind or (isinstance(k, tuple) and k[0] == kind)]:
+            del _clients[key]
+
+def get_arxiv_client():
+    return _client('arxiv', lambda: _factories['arxiv']())
+
+def get_http_session():
+    """Shared keep-alive session for PDF downloads."""
+    return _client('http', lambda: _factories['http']())
+
+def get_chat_model(model, temperature, max_retries=2):
+    return _client(
+        ('chat', model, temperature, max_retries),
+        lambda: _factories['chat'](model, temperature, max_retries)
+    )
+
+def get_embeddings(model):
+    return _client(('embeddings', model), lambda: _factories['embeddings'](model))
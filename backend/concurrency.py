@@ -0,0 +1,39 @@
+import threading
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def single_flight(key, fn):
+    """Run fn() once per key at a time; concurrent callers share its outcome.
+
+    Returns (result, leader) where leader is False for callers that waited
+    on another caller's run.
+    """
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, False
+
+    try:
+        flight.result = fn()
+        return flight.result, True
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        flight.done.set()
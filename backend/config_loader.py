@@ -1,40 +1,104 @@
 import yaml
 import os
+import threading
+from types import MappingProxyType
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.yaml')
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+def _merged(base, updates):
+    merged = dict(base)
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merged(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+class ConfigSnapshot:
+    """An immutable set of settings: the base config plus any request overrides.
+
+    ``get`` returns plain copies of nested sections, so callers can never
+    change the snapshot another request is reading.
+    """
+
+    def __init__(self, data):
+        self._data = _freeze(data)
+
+    def get(self, *keys):
+        value = self._data
+        for key in keys:
+            value = value[key]
+        return _thaw(value)
+
+    def to_dict(self):
+        return _thaw(self._data)
+
+    def with_overrides(self, overrides):
+        """A new snapshot with overrides (a nested dict) layered on top."""
+        if not overrides:
+            return self
+        return ConfigSnapshot(_merged(self.to_dict(), overrides))
 
 class Config:
+    """Process-wide base configuration loaded from config.yaml.
+
+    Requests read a snapshot (optionally with overrides) instead of changing
+    shared state; config.yaml is only rewritten by an explicit ``save``.
+    """
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._lock = threading.Lock()
             cls._instance._load_config()
         return cls._instance
-    
+
     def _load_config(self):
-        config_path = os.path.join(os.path.dirname(__file__), 'config.yaml')
-        with open(config_path, 'r') as f:
-            self.data = yaml.safe_load(f)
-    
+        with open(CONFIG_PATH, 'r') as f:
+            self._base = ConfigSnapshot(yaml.safe_load(f))
+
     def get(self, *keys):
-        value = self.data
-        for key in keys:
-            value = value[key]
-        return value
-    
-    def update(self, updates):
-        self._update_nested(self.data, updates)
-        self._save_config()
-    
-    def _update_nested(self, d, updates):
-        for key, value in updates.items():
-            if isinstance(value, dict) and key in d:
-                self._update_nested(d[key], value)
-            else:
-                d[key] = value
-    
-    def _save_config(self):
-        config_path = os.path.join(os.path.dirname(__file__), 'config.yaml')
-        with open(config_path, 'w') as f:
-            yaml.dump(self.data, f, default_flow_style=False)
+        return self._base.get(*keys)
+
+    def to_dict(self):
+        return self._base.to_dict()
+
+    def snapshot(self, overrides=None):
+        """The current base config with overrides layered on top, frozen."""
+        return self._base.with_overrides(overrides)
+
+    def set_base(self, overrides):
+        """Layer overrides onto the base config for this process only, without saving.
+
+        Meant for offline tools such as the benchmarks, before any request runs.
+        """
+        with self._lock:
+            self._base = self._base.with_overrides(overrides)
+
+    def save(self, updates):
+        """Apply updates to the base config and persist it to config.yaml."""
+        with self._lock:
+            base = self._base.with_overrides(updates)
+            tmp_path = f"{CONFIG_PATH}.tmp"
+            with open(tmp_path, 'w') as f:
+                yaml.dump(base.to_dict(), f, default_flow_style=False)
+            os.replace(tmp_path, CONFIG_PATH)
+            self._base = base
+        return base
 
 config = Config()
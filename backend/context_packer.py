@@ -0,0 +1,132 @@
+import tiktoken
+from .lexical import tokenize
+
+_encoding = None
+
+def count_tokens(text):
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # The BPE file is downloaded on first use; estimate when that is impossible
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+def format_passage(passage):
+    return f"[From: {passage['title']}]\n{passage['text']}"
+
+def _passages(docs):
+    passages = []
+    for rank, doc in enumerate(docs):
+        if hasattr(doc, 'page_content'):
+            metadata, text = doc.metadata, doc.page_content
+        else:
+            metadata, text = doc['metadata'], doc['page_content']
+        passages.append({
+            'arxiv_id': metadata['arxiv_id'],
+            'title': metadata['title'],
+            'text': text,
+            'start': metadata.get('start'),
+            'end': metadata.get('end'),
+            'rank': rank
+        })
+    return passages
+
+def merge_neighbors(passages):
+    """Join chunks of the same paper whose character ranges overlap or touch.
+
+    The merged passage keeps the best rank of its parts. Passages without
+    offsets (e.g. from an older vector collection) are left as they are.
+    """
+    merged = []
+    by_paper = {}
+    for passage in passages:
+        if passage['start'] is None:
+            merged.append(passage)
+        else:
+            by_paper.setdefault(passage['arxiv_id'], []).append(passage)
+
+    for group in by_paper.values():
+        group.sort(key=lambda p: p['start'])
+        current = dict(group[0])
+        for passage in group[1:]:
+            if passage['start'] <= current['end']:
+                if passage['end'] > current['end']:
+                    current['text'] += passage['text'][current['end'] - passage['start']:]
+                    current['end'] = passage['end']
+                current['rank'] = min(current['rank'], passage['rank'])
+            else:
+                merged.append(current)
+                current = dict(passage)
+        merged.append(current)
+
+    merged.sort(key=lambda p: p['rank'])
+    return merged
+
+def _shingles(tokens, size=3):
+    if len(tokens) < size:
+        return set(tokens)
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def drop_near_duplicates(passages, threshold=0.8):
+    """Keep the best-ranked of any passages whose word 3-gram overlap reaches threshold."""
+    kept = []
+    for passage in passages:
+        passage['shingles'] = _shingles(tokenize(passage['text']))
+        if all(_jaccard(passage['shingles'], other['shingles']) < threshold for other in kept):
+            kept.append(passage)
+    return kept
+
+def select_diverse(passages, budget_tokens, mmr_lambda=0.7):
+    """Greedy MMR selection of passages that fit in budget_tokens.
+
+    Relevance comes from retrieval rank. Redundancy is word overlap with the
+    passages already chosen, raised for passages of the same paper so that
+    context spreads across papers.
+    """
+    if not passages:
+        return []
+    n = max(p['rank'] for p in passages) + 1
+    for passage in passages:
+        passage['relevance'] = 1 - passage['rank'] / n
+        passage['words'] = set(tokenize(passage['text']))
+        passage['tokens'] = count_tokens(format_passage(passage))
+
+    selected = []
+    remaining = list(passages)
+    budget = budget_tokens
+    while remaining:
+        best = None
+        best_score = None
+        for passage in remaining:
+            if passage['tokens'] > budget:
+                continue
+            redundancy = 0.0
+            for other in selected:
+                similarity = _jaccard(passage['words'], other['words'])
+                if other['arxiv_id'] == passage['arxiv_id']:
+                    similarity = (1 + similarity) / 2
+                redundancy = max(redundancy, similarity)
+            score = mmr_lambda * passage['relevance'] - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = passage, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+        budget -= best['tokens']
+    return selected
+
+def pack_context(docs, budget_tokens, dedup_threshold=0.8, mmr_lambda=0.7):
+    """Turn ranked retrieval results into a deduplicated, diverse passage list within a token budget."""
+    passages = merge_neighbors(_passages(docs))
+    passages = drop_near_duplicates(passages, dedup_threshold)
+    return select_diverse(passages, budget_tokens, mmr_lambda)
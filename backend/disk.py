@@ -0,0 +1,50 @@
+import os
+import shutil
+
+def evict_lru(directory, max_bytes, suffixes, keep=None):
+    """Delete the least recently used files ending in suffixes until they fit in max_bytes.
+
+    A file's modification time is its LRU timestamp, so readers touch the
+    files they reuse. ``keep`` is never deleted. Callers serialize calls for
+    the same directory. Returns the number of files deleted.
+    """
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(suffixes):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    entries.sort()
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def remove_except(directory, names):
+    """Delete every file and subdirectory of directory whose name is not in names."""
+    names = set(names)
+    for entry in os.scandir(directory):
+        if entry.name in names:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
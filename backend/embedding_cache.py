@@ -0,0 +1,190 @@
+import hashlib
+import os
+import re
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .clients import get_embeddings, throttle_openai
+from .config_loader import config
+from .metrics import CACHE_REQUESTS, record_tokens
+
+CACHE_DIR = "data/embeddings"
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def text_key(text):
+    return hashlib.sha1(text.encode('utf-8', 'ignore')).hexdigest()
+
+class EmbeddingStore:
+    """Content-addressed embedding cache for one model.
+
+    Vectors are appended to ``<model>.vectors`` as a flat float16/float32
+    array and read back through a memory map. ``<model>.keys`` holds one text
+    hash per line, so the row of a vector is the line number of its key.
+    Only texts not already in the store are sent to the provider.
+    """
+
+    def __init__(self, model, cache_dir=CACHE_DIR, dtype='float16', batch_size=256):
+        self.model = model
+        self.dtype = np.dtype(dtype)
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', model)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(cache_dir, f"{safe_name}.{self.dtype.name}.vectors")
+        self.keys_path = os.path.join(cache_dir, f"{safe_name}.{self.dtype.name}.keys")
+
+        self.dim = None
+        self.rows = {}
+        self.n_rows = 0
+        self.matrix = None
+        self._load()
+
+    def _reset(self):
+        for path in (self.vectors_path, self.keys_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load(self):
+        """Read the key list and realign both files after an interrupted append.
+
+        Row i of the vectors file belongs to key line i. Vectors without a key
+        (including a half-written last row) are truncated away, and keys
+        without a vector are dropped from the keys file, so appends that
+        follow land at the right row.
+        """
+        if not os.path.exists(self.vectors_path):
+            self._reset()
+            return
+        try:
+            with open(self.keys_path, 'r') as f:
+                lines = f.read().split('\n')
+            self.dim = int(lines[0][4:]) if lines[0].startswith('dim=') else None
+        except (OSError, UnicodeDecodeError, ValueError):
+            self.dim = None
+        if not self.dim:
+            # Vectors nobody can map back to a text are useless
+            self.dim = None
+            self._reset()
+            return
+        keys = [line for line in lines[1:] if line]
+
+        row_bytes = self.dim * self.dtype.itemsize
+        stored_rows = os.path.getsize(self.vectors_path) // row_bytes
+        if len(keys) > stored_rows:
+            keys = keys[:stored_rows]
+            self._write_keys(keys)
+        if os.path.getsize(self.vectors_path) != len(keys) * row_bytes:
+            os.truncate(self.vectors_path, len(keys) * row_bytes)
+
+        self.n_rows = len(keys)
+        self.rows = {key: row for row, key in enumerate(keys)}
+        self._remap()
+
+    def _write_keys(self, keys):
+        tmp_path = f"{self.keys_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"dim={self.dim}\n")
+            f.write(''.join(f"{key}\n" for key in keys))
+        os.replace(tmp_path, self.keys_path)
+
+    def _remap(self):
+        if self.n_rows:
+            self.matrix = np.memmap(
+                self.vectors_path, dtype=self.dtype, mode='r',
+                shape=(self.n_rows, self.dim)
+            )
+
+    def _embed_remote(self, texts):
+        provider = get_embeddings(self.model)
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            record_tokens(self.model, 'embedding', throttle_openai(self.model, batch))
+            vectors.extend(provider.embed_documents(batch))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _append(self, keys, vectors):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._write_keys([])
+
+        # Rows left by an append that failed before its keys were written are
+        # cut off first, so the new rows line up with the new key lines
+        row_bytes = self.dim * self.dtype.itemsize
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != self.n_rows * row_bytes:
+            os.truncate(self.vectors_path, self.n_rows * row_bytes)
+        base = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+
+        # Vectors go first, so a key line always has a complete row behind it
+        with open(self.vectors_path, 'ab') as f:
+            f.write(vectors.astype(self.dtype).tobytes())
+        with open(self.keys_path, 'a') as f:
+            f.write(''.join(f"{key}\n" for key in keys))
+
+        for offset, key in enumerate(keys):
+            self.rows[key] = base + offset
+        self.n_rows = base + len(keys)
+        self._remap()
+
+    def embed(self, texts):
+        """Return a float32 (len(texts), dim) array of embeddings.
+
+        The lock covers only the in-memory lookups and the file append, so
+        provider calls from different jobs run concurrently.
+        """
+        keys = [text_key(text) for text in texts]
+
+        with self.lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self.rows and key not in missing:
+                    missing[key] = text
+
+            self.stats['misses'] += len(missing)
+            self.stats['hits'] += len(texts) - len(missing)
+            CACHE_REQUESTS.inc(len(texts) - len(missing), cache='embedding', result='hit')
+            CACHE_REQUESTS.inc(len(missing), cache='embedding', result='miss')
+
+        if missing:
+            vectors = self._embed_remote(list(missing.values()))
+            with self.lock:
+                # Another caller may have stored some of these meanwhile
+                missing_keys = list(missing)
+                new = [i for i, key in enumerate(missing_keys) if key not in self.rows]
+                if new:
+                    self._append([missing_keys[i] for i in new], vectors[new])
+
+        with self.lock:
+            if not texts:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            rows = [self.rows[key] for key in keys]
+            return np.asarray(self.matrix[rows], dtype=np.float32)
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings adapter backed by an EmbeddingStore."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def embed_documents(self, texts):
+        return self.store.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.store.embed([text])[0].tolist()
+
+def get_embedding_store(model=None):
+    """Return the process-wide EmbeddingStore for a model."""
+    if model is None:
+        model = config.get('embeddings', 'model')
+    with _stores_lock:
+        if model not in _stores:
+            _stores[model] = EmbeddingStore(
+                model,
+                dtype=config.get('embeddings', 'cache_dtype'),
+                batch_size=config.get('embeddings', 'batch_size')
+            )
+        return _stores[model]
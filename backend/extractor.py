@@ -1,18 +1,26 @@
 from PyPDF2 import PdfReader
-import arxiv
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import re
+import time
+
+# Bump whenever extraction or cleaning changes so cached text is invalidated
+EXTRACTOR_VERSION = 2
+
+_SURROGATES = re.compile(r'[\ud800-\udfff]')
+_WHITESPACE = re.compile(r'[\s\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x84\x86-\x9f]+')
+_REFERENCES_HEADING = re.compile(
+    r'^\s*(?:\d+\.?\s*)?(?:References|REFERENCES|Bibliography|BIBLIOGRAPHY)\s*$',
+    re.MULTILINE
+)
 
 def clean_text(text):
     """Clean text to remove problematic Unicode characters that cause encoding issues."""
-    # Remove or replace surrogate characters and other problematic Unicode characters
-    # Surrogates are in the range U+D800 to U+DFFF
-    text = re.sub(r'[\ud800-\udfff]', '', text)
+    # Surrogates (U+D800 to U+DFFF) cannot be encoded and are dropped outright
+    text = _SURROGATES.sub('', text)
     
-    # Remove other common problematic characters
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x84\x86-\x9f]', ' ', text)
-    
-    # Replace multiple whitespaces with single space
-    text = re.sub(r'\s+', ' ', text)
+    # Control characters and whitespace runs collapse to a single space
+    text = _WHITESPACE.sub(' ', text)
     
     # Ensure the text can be encoded as UTF-8
     try:
@@ -22,34 +30,121 @@ def clean_text(text):
         # If there are still encoding issues, use a more aggressive approach
         return text.encode('utf-8', 'ignore').decode('utf-8')
 
-def extract_text(pdf_path):
-    try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += clean_text(page_text) + "\n"
-        
-        # Clean the final text
-        text = clean_text(text.strip())
-        
+def cache_version(max_pages=None, stop_at_references=False):
+    """Text cache version for a given page budget, so budgets never share entries."""
+    budget = max_pages if max_pages else 'all'
+    return f"{EXTRACTOR_VERSION}-{budget}{'-refs' if stop_at_references else ''}"
+
+def iter_pages(pdf_path, start=0, stop=None):
+    """Lazily yield the raw text of pages [start, stop) of a PDF."""
+    reader = PdfReader(pdf_path)
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    for page_num in range(start, stop):
+        yield reader.pages[page_num].extract_text() or ''
+
+def _extract_range(pdf_path, start, stop):
+    return list(iter_pages(pdf_path, start, stop))
+
+def _page_count(pdf_path):
+    return len(PdfReader(pdf_path).pages)
+
+def _truncate_at_references(page_text, page_num):
+    """Return (text, found) where text ends before a references heading."""
+    # Skip the first page so a table of contents cannot end the document early
+    if page_num == 0:
+        return page_text, False
+    match = _REFERENCES_HEADING.search(page_text)
+    if match is None:
+        return page_text, False
+    return page_text[:match.start()], True
+
+def _page_context():
+    """Start method for page-range workers.
+
+    Callers may be multi-threaded, and a forked child could inherit a lock
+    another thread holds. A fork server is single-threaded and already has
+    this module loaded, so its children start quickly without that risk;
+    where there is none, workers are spawned.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+def _iter_pages_parallel(pdf_path, stop, workers):
+    """Yield pages in order while page ranges are parsed in worker processes."""
+    span = -(-stop // workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_page_context()) as pool:
+        futures = [
+            pool.submit(_extract_range, pdf_path, start, min(start + span, stop))
+            for start in range(0, stop, span)
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+def _iter_budgeted_pages(pdf_path, max_pages=None, stop_at_references=False,
+                         workers=1, parallel_min_pages=40):
+    page_count = _page_count(pdf_path)
+    stop = min(page_count, max_pages) if max_pages else page_count
+
+    if workers > 1 and stop >= parallel_min_pages:
+        pages = _iter_pages_parallel(pdf_path, stop, workers)
+    else:
+        pages = iter_pages(pdf_path, 0, stop)
+
+    for page_num, page_text in enumerate(pages):
+        if stop_at_references:
+            page_text, found = _truncate_at_references(page_text, page_num)
+            if found:
+                yield page_text
+                return
+        yield page_text
+
+def paper_metadata(pdf_path, paper=None):
+    """Build the metadata dict for an extracted paper.
+
+    Uses ``paper`` (a search-result dict) when provided and falls back to the
+    metadata cache otherwise.
+    """
+    if paper is None or 'authors' not in paper:
+        # Imported here so parser processes never load the API clients
+        from .metadata import lookup_paper
         filename = pdf_path.split("/")[-1].replace(".pdf", "")
-        arxiv_id = filename.replace('_', '/')
-        
-        client = arxiv.Client()
-        search = arxiv.Search(id_list=[arxiv_id])
-        paper = next(client.results(search))
-        
-        metadata = {
-            "title": clean_text(paper.title),
-            "authors": [clean_text(author.name) for author in paper.authors],
-            "published": paper.published.strftime("%Y-%m-%d"),
-            "arxiv_id": paper.get_short_id()
-        }
+        paper = lookup_paper(filename.replace('_', '/'))
+    
+    return {
+        "title": clean_text(paper['title']),
+        "authors": [clean_text(author) for author in paper['authors']],
+        "published": paper['published'],
+        "arxiv_id": paper['arxiv_id']
+    }
+
+def extract_text(pdf_path, paper=None, max_pages=None, stop_at_references=False,
+                 workers=1, parallel_min_pages=40):
+    """Extract a PDF's text and metadata.
+
+    Pages are read lazily, up to ``max_pages`` and optionally stopping at the
+    references heading. Documents of at least ``parallel_min_pages`` pages are
+    split into page ranges across ``workers`` processes. Pages are joined once
+    and normalized in a single pass.
+    """
+    try:
+        pages = _iter_budgeted_pages(
+            pdf_path, max_pages, stop_at_references, workers, parallel_min_pages
+        )
+        text = clean_text(' '.join(pages)).strip()
         
-        return text, metadata
-    except StopIteration:
-        raise Exception(f"Could not find metadata for paper {arxiv_id}")
+        return text, paper_metadata(pdf_path, paper)
     except Exception as e:
         raise Exception(f"Error extracting text from {pdf_path}: {str(e)}")
+
+def timed_extract(pdf_path, paper=None, **options):
+    """extract_text in a worker process; the elapsed time is returned for the parent to record."""
+    started = time.perf_counter()
+    text, metadata = extract_text(pdf_path, paper, **options)
+    return text, metadata, time.perf_counter() - started
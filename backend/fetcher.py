@@ -1,23 +1,144 @@
-import arxiv
 import os
+import threading
+import time
+import requests
+from .clients import download_bucket, get_http_session
+from .concurrency import single_flight
+from .config_loader import config
+from .disk import evict_lru
+from .metadata import lookup_paper
+from .metrics import DOWNLOADED_BYTES, RETRIES, cache_result
 
-def fetch_paper(arxiv_id):
+PAPERS_DIR = "data/papers"
+DOWNLOAD_TIMEOUT = 60
+
+# Anything smaller is an error page or a stub, not a paper
+MIN_PDF_BYTES = 1024
+
+# Every complete PDF ends with %%EOF, give or take trailing whitespace or junk
+EOF_WINDOW = 1024
+
+_evict_lock = threading.Lock()
+
+class DownloadError(Exception):
+    """A download that failed in a way retrying will not fix."""
+
+def _pdf_path(arxiv_id):
+    return os.path.join(PAPERS_DIR, f"{arxiv_id.replace('/', '_')}.pdf")
+
+def is_valid_pdf(path):
+    """Cheap completeness check: PDF header, minimum size and a trailing %%EOF."""
+    try:
+        size = os.path.getsize(path)
+        if size < MIN_PDF_BYTES:
+            return False
+        with open(path, 'rb') as f:
+            if f.read(5) != b'%PDF-':
+                return False
+            f.seek(max(0, size - EOF_WINDOW))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+def _expected_size(response):
+    """Full file size announced by the server, or None when it didn't say."""
+    if response.status_code == 206:
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+def _download(url, part_path):
+    """Stream url into part_path, resuming from a partial file when the server allows."""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f"bytes={offset}-"} if offset else {}
+
+    # Downloads share one keep-alive session and a request-rate budget
+    download_bucket().acquire()
+    with get_http_session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT, headers=headers) as response:
+        if response.status_code == 416:
+            # Our partial file is no prefix of what the server has; start over
+            os.remove(part_path)
+            raise requests.RequestException("Partial download no longer matches, restarting")
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise DownloadError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+
+        # A 200 means the server ignored the range and is sending the whole file
+        mode = 'ab' if response.status_code == 206 else 'wb'
+        expected = _expected_size(response)
+        with open(part_path, mode) as f:
+            for block in response.iter_content(chunk_size=64 * 1024):
+                f.write(block)
+                DOWNLOADED_BYTES.inc(len(block))
+
+    size = os.path.getsize(part_path)
+    if expected is not None and size != expected:
+        raise requests.RequestException(f"Download stopped at {size} of {expected} bytes")
+
+def _fetch_to_store(url, pdf_path):
+    attempts = config.get('clients', 'download_attempts')
+    if attempts < 1:
+        raise Exception(f"clients.download_attempts must be at least 1, got {attempts}")
+    part_path = f"{pdf_path}.part"
+    for attempt in range(attempts):
+        try:
+            _download(url, part_path)
+            if is_valid_pdf(part_path):
+                # Readers only ever see a complete file under the final name
+                os.replace(part_path, pdf_path)
+                _evict(keep=pdf_path)
+                return
+            # Complete but not a usable PDF: resuming would only extend the garbage
+            os.remove(part_path)
+            error = DownloadError("Downloaded file is not a valid PDF")
+        except DownloadError:
+            raise
+        except (requests.RequestException, OSError) as e:
+            error = e
+        if attempt + 1 < attempts:
+            RETRIES.inc(target='download')
+            time.sleep(2 ** attempt)
+    raise error
+
+def _evict(keep=None):
+    """Delete least recently used PDFs until the store fits in its quota.
+
+    Abandoned partial downloads count towards the quota and age out the same way.
+    """
+    max_bytes = config.get('cache', 'paper_store_mb') * 1024 * 1024
+    with _evict_lock:
+        evict_lru(PAPERS_DIR, max_bytes, ('.pdf', '.pdf.part'), keep)
+
+def fetch_paper(paper):
+    """Download a paper's PDF, reusing the search-result dict when given one.
+
+    Accepts either a paper dict (as returned by search_papers) or a bare
+    arXiv ID, in which case the metadata is looked up through the cache.
+    Stored PDFs are checked before reuse, concurrent requests for the same
+    paper share one download, and the store is kept within its disk quota.
+    """
+    arxiv_id = paper if isinstance(paper, str) else paper['arxiv_id']
     try:
-        client = arxiv.Client()
-        search = arxiv.Search(id_list=[arxiv_id])
-        paper = next(client.results(search))
-        
-        clean_id = paper.get_short_id()
-        safe_filename = clean_id.replace('/', '_')
-        pdf_path = f"data/papers/{safe_filename}.pdf"
-        
-        if os.path.exists(pdf_path):
+        if isinstance(paper, str) or not paper.get('pdf_url'):
+            paper = lookup_paper(arxiv_id)
+
+        os.makedirs(PAPERS_DIR, exist_ok=True)
+        pdf_path = _pdf_path(paper['arxiv_id'])
+
+        def fetch():
+            if is_valid_pdf(pdf_path):
+                cache_result('pdf', True)
+                # The modification time doubles as the LRU timestamp
+                try:
+                    os.utime(pdf_path)
+                except OSError:
+                    pass
+                return pdf_path
+            cache_result('pdf', False)
+            _fetch_to_store(paper['pdf_url'], pdf_path)
             return pdf_path
-        
-        paper.download_pdf(filename=pdf_path)
-        
-        return pdf_path
-    except StopIteration:
-        raise Exception(f"Paper {arxiv_id} not found on ArXiv")
+
+        return single_flight(f"pdf:{pdf_path}", fetch)[0]
     except Exception as e:
         raise Exception(f"Error fetching paper {arxiv_id}: {str(e)}")
@@ -1,216 +1,487 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
-from sklearn.feature_extraction.text import TfidfVectorizer
-from rank_bm25 import BM25Okapi
+import json
 import numpy as np
+import os
 import re
+from scipy import sparse
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait, FIRST_COMPLETED
+from .bm25 import BM25Index
+from .chunk_store import PaperChunks, get_chunk_store
+from .config_loader import config
+from .disk import remove_except
+from .embedding_cache import CachedEmbeddings, get_embedding_store
+from .inverted_index import InvertedIndex
+from .lexical import tokenize
+from .logger import log_warning
+from .scoring import top_k_indices
+from .tfidf import HashedTfidfIndex
+
+# A resident indexer over its paper cap is cut back to this fraction of it,
+# so compaction runs once per batch of new papers rather than on every one
+EVICT_TO = 0.75
+
+INDEX_DIR = "data/indexes"
+
+# Bump whenever chunk cleaning or tokenization changes so saved indexes are rebuilt
+INDEX_VERSION = 1
 
 class BaseIndexer:
     def __init__(self, chunk_size=1000, chunk_overlap=200):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+        self.store = get_chunk_store(chunk_size, chunk_overlap)
+        self.indexed_ids = set()
+        self.lock = threading.RLock()
     
-    def clean_text_for_indexing(self, text):
-        """Clean text to ensure it's safe for indexing and embedding."""
-        if not text:
-            return ""
-        
-        # Remove or replace surrogate characters and other problematic Unicode characters
-        text = re.sub(r'[\ud800-\udfff]', '', text)
+    def index(self, papers_data):
+        """Add papers that are not in the index yet; known arXiv IDs are skipped.
         
-        # Remove other common problematic characters
-        text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x84\x86-\x9f]', ' ', text)
+        New papers are embedded or tokenized before the lock is taken, so
+        searches from other requests only wait while their rows are appended.
+        """
+        papers = self.store.add_papers(papers_data)
+        with self.lock:
+            new_papers = {}
+            for paper in papers:
+                if paper.arxiv_id not in self.indexed_ids:
+                    new_papers[paper.arxiv_id] = paper
         
-        # Replace multiple whitespaces with single space
-        text = re.sub(r'\s+', ' ', text).strip()
+        new_papers = list(new_papers.values())
+        prepared = list(zip(new_papers, self.prepare(new_papers))) if new_papers else []
         
-        # Ensure the text can be encoded as UTF-8
-        try:
-            text.encode('utf-8')
-            return text
-        except UnicodeEncodeError:
-            return text.encode('utf-8', 'ignore').decode('utf-8')
+        with self.lock:
+            # Another request may have added some of the same papers meanwhile
+            prepared = [(paper, rows) for paper, rows in prepared if paper.arxiv_id not in self.indexed_ids]
+            if prepared:
+                self.add_papers(prepared)
+                self.indexed_ids.update(paper.arxiv_id for paper, _ in prepared)
+            self.touch([paper.arxiv_id for paper in papers])
+            self.save()
     
-    def index(self, papers_data):
+    def retrieve(self, query, top_k=10, arxiv_ids=None):
+        """Return the top_k chunks for a query, limited to arxiv_ids when given."""
+        with self.lock:
+            return self.search(query, top_k, arxiv_ids)
+    
+    def touch(self, arxiv_ids):
+        """Note that arxiv_ids were just requested; resident indexers evict by this."""
+    
+    def save(self):
+        """Persist what index just added; indexers without their own storage keep nothing."""
+    
+    def prepare(self, papers):
+        """Build each paper's new rows without the lock, one entry per paper."""
         raise NotImplementedError
     
-    def retrieve(self, query, top_k=10):
+    def add_papers(self, prepared):
+        """Append (paper, rows) pairs from prepare; called with the lock held."""
+        raise NotImplementedError
+    
+    def search(self, query, top_k, arxiv_ids):
         raise NotImplementedError
 
 class VectorIndexer(BaseIndexer):
-    def index(self, papers_data):
-        all_chunks = []
-        chunk_metadata = []
+    def __init__(self, chunk_size=1000, chunk_overlap=200, cfg=config):
+        super().__init__(chunk_size, chunk_overlap)
+        embedding_model = cfg.get('embeddings', 'model')
         
-        for paper_data in papers_data:
-            text = self.clean_text_for_indexing(paper_data['text'])
-            metadata = paper_data['metadata']
-            
-            # Clean metadata text as well
-            clean_metadata = {
-                'title': self.clean_text_for_indexing(metadata['title']),
-                'arxiv_id': metadata['arxiv_id']  # This should already be safe
-            }
-            
-            chunks = self.text_splitter.split_text(text)
-            # Clean each chunk to be extra safe
-            cleaned_chunks = [self.clean_text_for_indexing(chunk) for chunk in chunks]
-            all_chunks.extend(cleaned_chunks)
-            
-            for _ in chunks:
-                chunk_metadata.append(clean_metadata)
-        
-        embeddings = OpenAIEmbeddings()
-        self.vectorstore = Chroma.from_texts(
-            texts=all_chunks,
-            embedding=embeddings,
-            metadatas=chunk_metadata,
+        # One persistent collection per embedding model and chunking setup
+        collection_name = re.sub(
+            r'[^A-Za-z0-9_-]', '_',
+            f"papers_{embedding_model}_{chunk_size}_{chunk_overlap}"
+        )
+        self.embeddings = CachedEmbeddings(get_embedding_store(embedding_model))
+        self.vectorstore = Chroma(
+            collection_name=collection_name,
+            embedding_function=self.embeddings,
             persist_directory="chroma_db_multi"
         )
+        
+        stored = self.vectorstore.get(include=['metadatas'])
+        self.indexed_ids = {m['arxiv_id'] for m in stored['metadatas'] if m}
     
-    def retrieve(self, query, top_k=10):
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": top_k})
-        docs = retriever.invoke(query)
-        return docs
-
-class BM25Indexer(BaseIndexer):
-    def index(self, papers_data):
-        all_chunks = []
-        self.chunk_metadata = []
+    def prepare(self, papers):
+        # Embedding fills the embedding cache, so add_texts later only reads it back
+        self.embeddings.embed_documents([text for paper in papers for text in paper.iter_texts()])
+        return [None] * len(papers)
+    
+    def add_papers(self, prepared):
+        texts = []
+        metadatas = []
+        ids = []
         
-        for paper_data in papers_data:
-            text = self.clean_text_for_indexing(paper_data['text'])
-            metadata = paper_data['metadata']
-            
-            clean_metadata = {
-                'title': self.clean_text_for_indexing(metadata['title']),
-                'arxiv_id': metadata['arxiv_id']
-            }
-            
-            chunks = self.text_splitter.split_text(text)
-            cleaned_chunks = [self.clean_text_for_indexing(chunk) for chunk in chunks]
-            all_chunks.extend(cleaned_chunks)
-            
-            for _ in chunks:
-                self.chunk_metadata.append(clean_metadata)
+        for paper, _ in prepared:
+            texts.extend(paper.iter_texts())
+            metadatas.extend(paper.chunk_metadata(i) for i in range(len(paper)))
+            ids.extend(f"{paper.arxiv_id}:{i}" for i in range(len(paper)))
         
-        self.chunks = all_chunks
-        tokenized_chunks = [chunk.lower().split() for chunk in all_chunks]
-        self.bm25 = BM25Okapi(tokenized_chunks)
+        if texts:
+            self.vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
     
-    def retrieve(self, query, top_k=10):
-        tokenized_query = query.lower().split()
-        scores = self.bm25.get_scores(tokenized_query)
-        top_indices = np.argsort(scores)[::-1][:top_k]
-        
-        docs = []
-        for idx in top_indices:
-            docs.append({
-                'page_content': self.chunks[idx],
-                'metadata': self.chunk_metadata[idx]
-            })
+    def search(self, query, top_k, arxiv_ids):
+        search_kwargs = {"k": top_k}
+        if arxiv_ids is not None:
+            search_kwargs["filter"] = {"arxiv_id": {"$in": list(arxiv_ids)}}
+        retriever = self.vectorstore.as_retriever(search_kwargs=search_kwargs)
+        docs = retriever.invoke(query)
         return docs
 
-class TFIDFIndexer(BaseIndexer):
-    def index(self, papers_data):
-        all_chunks = []
-        self.chunk_metadata = []
+class ChunkListIndexer(BaseIndexer):
+    """Base for in-memory indexers over papers from the shared chunk store.
+    
+    A paper's chunks occupy a contiguous range of the indexer's document
+    rows, so a search limited to some papers scores only their rows. At
+    most ``indexer.max_resident_papers`` papers stay indexed; past that,
+    the least recently requested are evicted down to EVICT_TO of the cap
+    and the underlying index is compacted to the remaining rows.
+    
+    Subclasses may call restore to keep their index under INDEX_DIR. The
+    papers' chunk tables are saved next to it, in one file per batch, and a
+    manifest naming the files in use is replaced last, so an interrupted
+    save leaves the previous state readable.
+    """
+    
+    def __init__(self, chunk_size=1000, chunk_overlap=200):
+        super().__init__(chunk_size, chunk_overlap)
+        # Memory bounds are process-wide, so they come from the base config
+        self.max_papers = config.get('indexer', 'max_resident_papers')
+        self.papers = OrderedDict()
+        self.paper_rows = {}
+        self.row_papers = []
+        self.row_starts = np.zeros(0, dtype=np.int64)
+        self.n_rows = 0
+        self.path = None
+        self.persisted_index = None
+        self.paper_files = []
+        self.saved_papers = 0
+    
+    def _set_rows(self, papers):
+        self.paper_rows = {}
+        self.row_papers = []
+        self.n_rows = 0
+        starts = []
+        for paper in papers:
+            self.paper_rows[paper.arxiv_id] = (self.n_rows, self.n_rows + len(paper))
+            self.row_papers.append(paper)
+            starts.append(self.n_rows)
+            self.n_rows += len(paper)
+        self.row_starts = np.array(starts, dtype=np.int64)
+    
+    def restore(self, name, index_class):
+        """Return the index saved under INDEX_DIR/name, or a new one, and save there from now on.
         
-        for paper_data in papers_data:
-            text = self.clean_text_for_indexing(paper_data['text'])
-            metadata = paper_data['metadata']
-            
-            clean_metadata = {
-                'title': self.clean_text_for_indexing(metadata['title']),
-                'arxiv_id': metadata['arxiv_id']
-            }
-            
-            chunks = self.text_splitter.split_text(text)
-            cleaned_chunks = [self.clean_text_for_indexing(chunk) for chunk in chunks]
-            all_chunks.extend(cleaned_chunks)
+        ``index_class`` provides ``open(path, info)``, ``save(path)`` returning
+        that info, and ``len()`` in document rows.
+        """
+        self.path = os.path.join(INDEX_DIR, f"{name}.v{INDEX_VERSION}")
+        self.persisted_index = index_class()
+        try:
+            with open(os.path.join(self.path, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+            papers = []
+            for paper_file in manifest['papers']:
+                with open(os.path.join(self.path, 'papers', paper_file), 'r') as f:
+                    papers.extend(PaperChunks(**paper) for paper in json.load(f))
+            index = index_class.open(os.path.join(self.path, 'index'), manifest['index'])
+            if len(index) != sum(len(paper) for paper in papers):
+                raise ValueError("index rows do not match its papers")
+        except FileNotFoundError:
+            return self.persisted_index
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log_warning(f"Rebuilding index {self.path}: saved copy is unreadable ({e})")
+            return self.persisted_index
+        
+        self.persisted_index = index
+        self._set_rows(papers)
+        self.papers = OrderedDict((paper.arxiv_id, paper) for paper in papers)
+        self.indexed_ids = set(self.papers)
+        self.paper_files = manifest['papers']
+        self.saved_papers = len(papers)
+        return index
+    
+    def save(self):
+        """Write the papers and index rows added since the last save, then the manifest."""
+        if self.path is None or self.saved_papers == len(self.row_papers):
+            return
+        papers_dir = os.path.join(self.path, 'papers')
+        index_dir = os.path.join(self.path, 'index')
+        try:
+            os.makedirs(papers_dir, exist_ok=True)
+            paper_file = f"{uuid.uuid4().hex}.json"
+            with open(os.path.join(papers_dir, paper_file), 'w') as f:
+                json.dump([paper.to_dict() for paper in self.row_papers[self.saved_papers:]], f)
+            index_info = self.persisted_index.save(index_dir)
             
-            for _ in chunks:
-                self.chunk_metadata.append(clean_metadata)
+            manifest_path = os.path.join(self.path, 'manifest.json')
+            with open(f"{manifest_path}.tmp", 'w') as f:
+                json.dump({'papers': self.paper_files + [paper_file], 'index': index_info}, f)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+        except OSError as e:
+            log_warning(f"Could not save index {self.path}: {e}")
+            return
         
-        self.chunks = all_chunks
-        self.vectorizer = TfidfVectorizer(max_features=5000)
-        self.tfidf_matrix = self.vectorizer.fit_transform(all_chunks)
+        self.paper_files.append(paper_file)
+        self.saved_papers = len(self.row_papers)
+        # Only now is nothing the manifest names about to be deleted
+        remove_except(papers_dir, self.paper_files)
+        remove_except(index_dir, index_info['files'])
+    
+    def prepare(self, papers):
+        return [self.prepare_chunks(list(paper.iter_texts())) if len(paper) else None for paper in papers]
+    
+    def add_papers(self, prepared):
+        first_row = self.n_rows
+        starts = []
+        for paper, _ in prepared:
+            self.paper_rows[paper.arxiv_id] = (self.n_rows, self.n_rows + len(paper))
+            self.row_papers.append(paper)
+            starts.append(self.n_rows)
+            self.n_rows += len(paper)
+            self.papers[paper.arxiv_id] = paper
+        self.row_starts = np.concatenate([self.row_starts, np.array(starts, dtype=np.int64)])
+        if self.n_rows > first_row:
+            self.add_chunks([rows for _, rows in prepared if rows is not None])
+    
+    def touch(self, arxiv_ids):
+        for arxiv_id in arxiv_ids:
+            if arxiv_id in self.papers:
+                self.papers.move_to_end(arxiv_id)
+        if len(self.papers) > self.max_papers:
+            self.evict(set(arxiv_ids))
     
-    def retrieve(self, query, top_k=10):
-        query_vec = self.vectorizer.transform([query])
-        scores = (self.tfidf_matrix * query_vec.T).toarray().flatten()
-        top_indices = np.argsort(scores)[::-1][:top_k]
+    def evict(self, keep):
+        """Drop least recently requested papers (never those in keep) and compact."""
+        target = int(self.max_papers * EVICT_TO)
+        dropped = set()
+        for arxiv_id in self.papers:
+            if len(self.papers) - len(dropped) <= target:
+                break
+            if arxiv_id not in keep:
+                dropped.add(arxiv_id)
+        if not dropped:
+            return
         
+        kept = [paper for paper in self.row_papers if paper.arxiv_id not in dropped]
+        rows = [np.arange(*self.paper_rows[paper.arxiv_id]) for paper in kept]
+        self.compact(np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64))
+        
+        for arxiv_id in dropped:
+            del self.papers[arxiv_id]
+        self.indexed_ids -= dropped
+        self._set_rows(kept)
+        # The next save rewrites the kept papers as one file
+        self.paper_files = []
+        self.saved_papers = 0
+    
+    def prepare_chunks(self, texts):
+        """Index-specific rows for one paper's chunk texts, e.g. their tokens."""
+        raise NotImplementedError
+    
+    def add_chunks(self, prepared):
+        """Append the rows of several papers, as returned by prepare_chunks."""
+        raise NotImplementedError
+    
+    def compact(self, rows):
+        """Keep only the given document rows, renumbered in that order."""
+        raise NotImplementedError
+    
+    def rows_for(self, arxiv_ids):
+        """Document rows of the given papers, or None for no restriction."""
+        if arxiv_ids is None:
+            return None
+        ranges = [self.paper_rows[a] for a in dict.fromkeys(arxiv_ids) if a in self.paper_rows]
+        if not ranges:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in ranges])
+    
+    def docs_for(self, doc_ids):
         docs = []
-        for idx in top_indices:
-            docs.append({
-                'page_content': self.chunks[idx],
-                'metadata': self.chunk_metadata[idx]
-            })
+        for doc_id in doc_ids:
+            i = np.searchsorted(self.row_starts, doc_id, side='right') - 1
+            docs.append(self.row_papers[i].chunk_doc(doc_id - self.row_starts[i]))
         return docs
+    
+    def top_docs(self, scores, top_k, rows):
+        best = top_k_indices(scores, top_k)
+        return self.docs_for(best if rows is None else rows[best])
+
+class BM25Indexer(ChunkListIndexer):
+    def __init__(self, chunk_size=1000, chunk_overlap=200, cfg=config):
+        super().__init__(chunk_size, chunk_overlap)
+        self.bm25 = self.restore(f"bm25_{chunk_size}_{chunk_overlap}", BM25Index)
+    
+    def prepare_chunks(self, texts):
+        return [tokenize(text) for text in texts]
+    
+    def add_chunks(self, prepared):
+        self.bm25.add_documents(tokens for docs in prepared for tokens in docs)
+    
+    def compact(self, rows):
+        self.bm25.keep_rows(rows)
+    
+    def search(self, query, top_k, arxiv_ids):
+        rows = self.rows_for(arxiv_ids)
+        if not self.n_rows or (rows is not None and not len(rows)):
+            return []
+        scores = self.bm25.score([tokenize(query)], rows)
+        return self.top_docs(scores[0], top_k, rows)
+
+class TFIDFIndexer(ChunkListIndexer):
+    def __init__(self, chunk_size=1000, chunk_overlap=200, cfg=config):
+        super().__init__(chunk_size, chunk_overlap)
+        self.tfidf = HashedTfidfIndex(cfg.get('indexer', 'tfidf_features'))
+    
+    def prepare_chunks(self, texts):
+        return self.tfidf.transform(texts)
+    
+    def add_chunks(self, prepared):
+        self.tfidf.add_rows(sparse.vstack(prepared, format='csr'))
+    
+    def compact(self, rows):
+        self.tfidf.keep_rows(rows)
+    
+    def search(self, query, top_k, arxiv_ids):
+        return self.docs_for(self.tfidf.top_k(query, top_k, self.rows_for(arxiv_ids)))
+
+class InvertedIndexer(ChunkListIndexer):
+    def __init__(self, chunk_size=1000, chunk_overlap=200, cfg=config):
+        super().__init__(chunk_size, chunk_overlap)
+        self.inverted_index = self.restore(f"inverted_{chunk_size}_{chunk_overlap}", InvertedIndex)
+    
+    def prepare_chunks(self, texts):
+        return [tokenize(text) for text in texts]
+    
+    def add_chunks(self, prepared):
+        self.inverted_index.add_documents(tokens for docs in prepared for tokens in docs)
+    
+    def compact(self, rows):
+        self.inverted_index.keep_rows(rows)
+    
+    def search(self, query, top_k, arxiv_ids):
+        top_doc_ids = self.inverted_index.top_k(tokenize(query), top_k, self.rows_for(arxiv_ids))
+        return self.docs_for(top_doc_ids)
 
-class InvertedIndexer(BaseIndexer):
+class HybridIndexer(BaseIndexer):
+    """Runs several indexers concurrently and fuses their rankings with RRF.
+    
+    Each member has a latency budget from ``indexer.hybrid_budgets_ms``; a
+    member that misses it or raises is dropped from the fusion for that
+    query. Retrieval fails only when every member does.
+    """
+    
+    def __init__(self, chunk_size=1000, chunk_overlap=200, cfg=config):
+        super().__init__(chunk_size, chunk_overlap)
+        self.members = {
+            member: get_indexer(member, chunk_size, chunk_overlap, cfg)
+            for member in cfg.get('indexer', 'hybrid_members')
+        }
+        self.rrf_k = cfg.get('indexer', 'hybrid_rrf_k')
+        self.budgets = cfg.get('indexer', 'hybrid_budgets_ms')
+    
     def index(self, papers_data):
-        all_chunks = []
-        self.chunk_metadata = []
-        
-        for paper_data in papers_data:
-            text = self.clean_text_for_indexing(paper_data['text'])
-            metadata = paper_data['metadata']
-            
-            clean_metadata = {
-                'title': self.clean_text_for_indexing(metadata['title']),
-                'arxiv_id': metadata['arxiv_id']
-            }
-            
-            chunks = self.text_splitter.split_text(text)
-            cleaned_chunks = [self.clean_text_for_indexing(chunk) for chunk in chunks]
-            all_chunks.extend(cleaned_chunks)
-            
-            for _ in chunks:
-                self.chunk_metadata.append(clean_metadata)
-        
-        self.chunks = all_chunks
-        self.inverted_index = {}
-        
-        for doc_id, chunk in enumerate(all_chunks):
-            words = set(chunk.lower().split())
-            for word in words:
-                if word not in self.inverted_index:
-                    self.inverted_index[word] = []
-                self.inverted_index[word].append(doc_id)
+        futures = [
+            _hybrid_pool.submit(member.index, papers_data)
+            for member in self.members.values()
+        ]
+        for future in futures:
+            future.result()
     
-    def retrieve(self, query, top_k=10):
-        query_words = set(query.lower().split())
-        doc_scores = {}
+    def retrieve(self, query, top_k=10, arxiv_ids=None):
+        started = time.monotonic()
+        futures = {
+            name: _hybrid_pool.submit(member.retrieve, query, top_k * 2, arxiv_ids)
+            for name, member in self.members.items()
+        }
         
-        for word in query_words:
-            if word in self.inverted_index:
-                for doc_id in self.inverted_index[word]:
-                    doc_scores[doc_id] = doc_scores.get(doc_id, 0) + 1
+        rankings = []
+        slow = {}
+        for name, future in futures.items():
+            deadline = started + self.budgets.get(name, 10000) / 1000
+            try:
+                rankings.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FuturesTimeout:
+                log_warning(f"Hybrid retrieval dropped {name}: over its latency budget")
+                slow[future] = name
+            except Exception as e:
+                log_warning(f"Hybrid retrieval dropped {name}: {e}")
         
-        top_doc_ids = sorted(doc_scores.keys(), key=lambda x: doc_scores[x], reverse=True)[:top_k]
+        # Never come back empty-handed just because every member was slow
+        pending = set(slow)
+        while not rankings and pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    rankings.append(future.result())
+                except Exception as e:
+                    log_warning(f"Hybrid retrieval dropped {slow[future]}: {e}")
         
-        docs = []
-        for doc_id in top_doc_ids:
-            docs.append({
-                'page_content': self.chunks[doc_id],
-                'metadata': self.chunk_metadata[doc_id]
-            })
-        return docs
+        if not rankings:
+            raise Exception("Hybrid retrieval failed: every member indexer failed")
+        
+        return reciprocal_rank_fusion(rankings, top_k, self.rrf_k)
+
+def _doc_key(doc):
+    if hasattr(doc, 'page_content'):
+        return doc.metadata['arxiv_id'], doc.page_content
+    return doc['metadata']['arxiv_id'], doc['page_content']
+
+def reciprocal_rank_fusion(rankings, top_k, k=60):
+    """Merge ranked doc lists, scoring each doc by the sum of 1 / (k + rank)."""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, doc)
+    
+    fused = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [docs[key] for key in fused]
+
+_hybrid_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hybrid')
 
-def get_indexer(indexer_type, chunk_size=1000, chunk_overlap=200):
+_indexers = {}
+_indexers_lock = threading.RLock()
+
+def _settings_key(indexer_type, cfg):
+    """The settings besides chunking that change how an indexer is built."""
+    if indexer_type == 'vector':
+        return (cfg.get('embeddings', 'model'),)
+    if indexer_type == 'tfidf':
+        return (cfg.get('indexer', 'tfidf_features'),)
+    if indexer_type == 'hybrid':
+        return tuple(
+            _settings_key(member, cfg) + (member,)
+            for member in cfg.get('indexer', 'hybrid_members')
+        ) + (
+            cfg.get('indexer', 'hybrid_rrf_k'),
+            tuple(sorted(cfg.get('indexer', 'hybrid_budgets_ms').items()))
+        )
+    return ()
+
+def get_indexer(indexer_type, chunk_size=1000, chunk_overlap=200, cfg=config):
+    """Return the long-lived indexer for a type, chunking setup and settings.
+
+    Indexers are shared across requests and grow incrementally, so papers
+    that were indexed before are not chunked or embedded again. Requests
+    whose ``cfg`` differs in indexer settings get their own instance.
+    """
     indexers = {
         'vector': VectorIndexer,
         'bm25': BM25Indexer,
         'tfidf': TFIDFIndexer,
-        'inverted': InvertedIndexer
+        'inverted': InvertedIndexer,
+        'hybrid': HybridIndexer
     }
     
     if indexer_type not in indexers:
         raise ValueError(f"Unknown indexer type: {indexer_type}")
     
-    return indexers[indexer_type](chunk_size, chunk_overlap)
+    key = (indexer_type, chunk_size, chunk_overlap) + _settings_key(indexer_type, cfg)
+    
+    with _indexers_lock:
+        if key not in _indexers:
+            _indexers[key] = indexers[indexer_type](chunk_size, chunk_overlap, cfg)
+        return _indexers[key]
@@ -0,0 +1,218 @@
+import heapq
+import json
+import os
+import uuid
+from collections import defaultdict
+import numpy as np
+
+MAX_SEGMENTS = 8
+
+class Segment:
+    """Immutable block of postings for documents [base, base + n_docs).
+
+    Terms are a sorted NumPy string array looked up with searchsorted.
+    Postings are stored as delta-encoded uint32 runs in one flat array,
+    with ``offsets[i]:offsets[i + 1]`` covering the run of ``terms[i]``. The
+    first delta of a run is relative to ``base``. ``name`` is the directory
+    the segment was saved to, or None until it is saved.
+    """
+
+    def __init__(self, base, n_docs, terms, offsets, deltas):
+        self.base = base
+        self.n_docs = n_docs
+        self.terms = terms
+        self.offsets = offsets
+        self.deltas = deltas
+        self.name = None
+
+    @classmethod
+    def build(cls, base, tokenized_docs):
+        postings = defaultdict(list)
+        n_docs = 0
+        for doc_id, tokens in enumerate(tokenized_docs):
+            for term in set(tokens):
+                postings[term].append(doc_id)
+            n_docs = doc_id + 1
+        return cls.from_postings(base, n_docs, postings)
+
+    @classmethod
+    def from_postings(cls, base, n_docs, postings):
+        """Encode {term: ascending doc ids relative to base} into a segment."""
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        runs = []
+        for i, term in enumerate(terms):
+            doc_ids = np.asarray(postings[term], dtype=np.int64)
+            runs.append(np.diff(doc_ids, prepend=0).astype(np.uint32))
+            offsets[i + 1] = offsets[i] + len(doc_ids)
+        deltas = np.concatenate(runs) if runs else np.zeros(0, dtype=np.uint32)
+        return cls(base, n_docs, np.array(terms, dtype=str), offsets, deltas)
+
+    @classmethod
+    def from_arrays(cls, base, n_docs, terms, term_idx, doc_ids):
+        """Encode parallel (index into sorted terms, absolute doc id) posting arrays."""
+        order = np.lexsort((doc_ids, term_idx))
+        term_idx = term_idx[order]
+        doc_ids = doc_ids[order] - base
+        used, counts = np.unique(term_idx, return_counts=True)
+        offsets = np.zeros(len(used) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        deltas = np.diff(doc_ids, prepend=0)
+        # Each run starts over from base
+        deltas[offsets[:-1]] = doc_ids[offsets[:-1]]
+        return cls(base, n_docs, terms[used], offsets, deltas.astype(np.uint32))
+
+    def decode(self):
+        """(term index, absolute doc id) of every posting, without a Python loop."""
+        lengths = np.diff(self.offsets)
+        term_idx = np.repeat(np.arange(len(self.terms)), lengths)
+        if not len(self.deltas):
+            return term_idx, np.zeros(0, dtype=np.int64)
+        totals = np.cumsum(self.deltas, dtype=np.int64)
+        starts = self.offsets[:-1]
+        before_run = totals[starts] - self.deltas[starts]
+        return term_idx, self.base + totals - np.repeat(before_run, lengths)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'terms.npy'), self.terms)
+        np.save(os.path.join(path, 'offsets.npy'), self.offsets)
+        np.save(os.path.join(path, 'deltas.npy'), self.deltas)
+        with open(os.path.join(path, 'segment.json'), 'w') as f:
+            json.dump({'base': self.base, 'n_docs': self.n_docs}, f)
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, 'segment.json'), 'r') as f:
+            info = json.load(f)
+        segment = cls(
+            info['base'], info['n_docs'],
+            np.load(os.path.join(path, 'terms.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'deltas.npy'), mmap_mode='r')
+        )
+        segment.name = os.path.basename(path)
+        return segment
+
+    def postings(self, term):
+        """Absolute doc ids containing term, decoded from the delta run."""
+        pos = np.searchsorted(self.terms, term)
+        if pos >= len(self.terms) or self.terms[pos] != term:
+            return None
+        run = self.deltas[self.offsets[pos]:self.offsets[pos + 1]]
+        return self.base + np.cumsum(run, dtype=np.int64)
+
+def merge_segments(segments, base, n_docs, remap=None):
+    """One segment holding the postings of several, decoded and re-encoded as arrays.
+
+    With ``remap``, old doc ids are renumbered through it and postings whose
+    doc maps to -1 are dropped.
+    """
+    terms = np.unique(np.concatenate([segment.terms for segment in segments]))
+    term_parts = []
+    doc_parts = []
+    for segment in segments:
+        term_idx, doc_ids = segment.decode()
+        term_parts.append(np.searchsorted(terms, segment.terms)[term_idx])
+        doc_parts.append(doc_ids)
+    term_idx = np.concatenate(term_parts)
+    doc_ids = np.concatenate(doc_parts)
+    if remap is not None:
+        doc_ids = remap[doc_ids]
+        keep = doc_ids >= 0
+        term_idx = term_idx[keep]
+        doc_ids = doc_ids[keep]
+    return Segment.from_arrays(base, n_docs, terms, term_idx, doc_ids)
+
+class InvertedIndex:
+    """Append-only inverted index scored by the number of matching query terms.
+
+    Each batch of added documents becomes a new segment. Once there are
+    more than MAX_SEGMENTS, the newest, smallest segments are merged, so
+    segment sizes grow geometrically and each posting is re-encoded only a
+    logarithmic number of times.
+
+    Segments are immutable, so saving writes only those not saved yet, each
+    to its own directory. Saved segments are opened as memory-mapped
+    arrays, so nothing is read until a query touches it.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.n_docs = 0
+
+    def __len__(self):
+        return self.n_docs
+
+    def add_documents(self, tokenized_docs):
+        segment = Segment.build(self.n_docs, tokenized_docs)
+        if segment.n_docs:
+            self.segments.append(segment)
+            self.n_docs += segment.n_docs
+        while len(self.segments) > MAX_SEGMENTS:
+            self.merge_tail()
+
+    def merge_tail(self):
+        """Merge the newest segments until the one before them is larger than the merged block."""
+        start = len(self.segments) - 2
+        size = self.segments[-1].n_docs + self.segments[-2].n_docs
+        while start > 0 and self.segments[start - 1].n_docs <= size:
+            start -= 1
+            size += self.segments[start].n_docs
+        tail = self.segments[start:]
+        self.segments[start:] = [merge_segments(tail, tail[0].base, size)]
+
+    def keep_rows(self, rows):
+        """Keep only the given documents, renumbered in that order, in one segment."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.segments:
+            remap = np.full(self.n_docs, -1, dtype=np.int64)
+            remap[rows] = np.arange(len(rows))
+            self.segments = [merge_segments(self.segments, 0, len(rows), remap)]
+        self.n_docs = len(rows)
+
+    def save(self, path):
+        """Write unsaved segments under path and return the info open needs.
+
+        ``info['files']`` lists the segment directories in use; others under
+        path are left for the caller to delete once it has recorded the info.
+        """
+        os.makedirs(path, exist_ok=True)
+        for segment in self.segments:
+            if segment.name is None:
+                name = f"segment-{uuid.uuid4().hex}"
+                segment.save(os.path.join(path, name))
+                segment.name = name
+        return {'n_docs': self.n_docs, 'files': [segment.name for segment in self.segments]}
+
+    @classmethod
+    def open(cls, path, info):
+        index = cls()
+        index.segments = [Segment.open(os.path.join(path, name)) for name in info['files']]
+        index.n_docs = info['n_docs']
+        return index
+
+    def matches(self, query_terms, rows=None):
+        """Matching doc ids and the number of distinct query terms each contains.
+
+        Only the query terms' postings are decoded, and with ``rows`` only
+        those documents count, so the cost does not grow with the index.
+        """
+        runs = []
+        for term in set(query_terms):
+            for segment in self.segments:
+                doc_ids = segment.postings(term)
+                if doc_ids is not None:
+                    runs.append(doc_ids)
+        if not runs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        doc_ids = np.concatenate(runs)
+        if rows is not None:
+            doc_ids = doc_ids[np.isin(doc_ids, rows)]
+        return np.unique(doc_ids, return_counts=True)
+
+    def top_k(self, query_terms, k, rows=None):
+        """Doc ids of the k best-matching documents, among rows when given, best first, via a heap."""
+        doc_ids, counts = self.matches(query_terms, rows)
+        best = heapq.nlargest(k, range(len(doc_ids)), key=lambda i: (counts[i], -doc_ids[i]))
+        return [int(doc_ids[i]) for i in best]
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+TERMINAL_STATES = ('succeeded', 'failed')
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    """A submitted report run and the progress events it has produced so far."""
+
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.request = request
+        self.fingerprint = json.dumps(request, sort_keys=True, default=str)
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.created = time.time()
+        self.events = []
+        self.lock = threading.Lock()
+        self.waiters = set()
+
+    def emit(self, event, data, status=None):
+        with self.lock:
+            # Status and its event change together so readers never see one without the other
+            if status is not None:
+                self.status = status
+            self.events.append({'event': event, 'data': data})
+            waiters = list(self.waiters)
+        # Listeners wait on their own event loops; wake them without blocking a thread
+        for loop, wake in waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # the listener's loop has closed
+
+    async def next_events(self, cursor, timeout):
+        """Wait until there are events past cursor (or timeout) and return them.
+
+        Waiting happens on the caller's event loop, not on a worker thread,
+        so open event streams cost no threads.
+        """
+        wake = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wake)
+        with self.lock:
+            if len(self.events) > cursor or self.status in TERMINAL_STATES:
+                return self.events[cursor:]
+            self.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+        with self.lock:
+            return self.events[cursor:]
+
+    async def wait(self):
+        """Wait on the caller's event loop until the job has finished."""
+        cursor = 0
+        while not self.finished():
+            cursor += len(await self.next_events(cursor, 15))
+
+    def finished(self):
+        return self.status in TERMINAL_STATES
+
+    def summary(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created': self.created,
+            'result': self.result,
+            'error': self.error,
+            'status_code': self.status_code
+        }
+
+class JobManager:
+    """Runs report jobs on a bounded worker pool.
+
+    At most ``max_workers`` jobs run at once and ``max_queue`` more may wait;
+    submissions beyond that raise JobQueueFull so callers can push back.
+    Finished jobs are kept for inspection up to ``retain`` entries.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8, retain=200):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retain = retain
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+    def pending(self):
+        return sum(1 for job in self.jobs.values() if not job.finished())
+
+    def submit(self, fn, request):
+        """Queue fn(request, emit) as a new job and return it immediately.
+
+        Submitting a request identical to one that is still pending returns
+        the existing job instead of starting another run.
+        """
+        fingerprint = json.dumps(request, sort_keys=True, default=str)
+        with self.lock:
+            for job in self.jobs.values():
+                if job.fingerprint == fingerprint and not job.finished():
+                    return job
+            if self.pending() >= self.max_workers + self.max_queue:
+                raise JobQueueFull(f"Job queue is full ({self.max_queue} waiting)")
+            job = Job(uuid.uuid4().hex, request)
+            self.jobs[job.id] = job
+            self._prune()
+        job.emit('status', {'status': 'queued'})
+        self.pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status_counts(self):
+        """Retained jobs by status, e.g. {'running': 1, 'succeeded': 4}."""
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished()]
+        for job_id in finished[:max(0, len(self.jobs) - self.retain)]:
+            del self.jobs[job_id]
+
+    def _run(self, job, fn):
+        job.emit('status', {'status': 'running'}, status='running')
+        try:
+            result = fn(job.request, job.emit)
+        except Exception as e:
+            job.error = str(e)
+            job.status_code = getattr(e, 'status_code', 500)
+            if not hasattr(e, 'status_code'):
+                job.error = f"{e}\n\nTraceback: {traceback.format_exc()}"
+            job.emit('failed', {'status_code': job.status_code, 'detail': job.error}, status='failed')
+        else:
+            job.result = result
+            job.emit('result', result, status='succeeded')
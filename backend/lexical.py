@@ -0,0 +1,7 @@
+import re
+
+_TOKEN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Case-folded word tokens in any script; punctuation never splits the vocabulary."""
+    return _TOKEN.findall(text.casefold())
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .clients import estimate_tokens, get_chat_model, throttle_openai
+from .config_loader import config
+from .metrics import cache_result, record_tokens
+
+CACHE_PATH = "data/llm_cache.sqlite"
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+def _connect():
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+        "created REAL NOT NULL, last_used REAL NOT NULL)"
+    )
+    return conn
+
+def cache_key(params, prompt):
+    payload = json.dumps({'params': params, 'prompt': prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def lookup(key):
+    ttl = config.get('cache', 'llm_ttl_hours') * 3600
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > ttl:
+                _stats['misses'] += 1
+                cache_result('llm', False)
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            _stats['hits'] += 1
+            cache_result('llm', True)
+            return row[0]
+        finally:
+            conn.close()
+
+def store(key, content):
+    ttl = config.get('cache', 'llm_ttl_hours') * 3600
+    max_entries = config.get('cache', 'llm_max_entries')
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            # Drop expired entries, then the least recently used beyond the size bound
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - ttl,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (max_entries,)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+def record_usage(model, prompt, content, usage=None):
+    """Count a call's tokens, from the provider's usage metadata when it reports any."""
+    if usage:
+        record_tokens(model, 'prompt', usage.get('input_tokens', 0))
+        record_tokens(model, 'completion', usage.get('output_tokens', 0))
+    else:
+        record_tokens(model, 'prompt', estimate_tokens([prompt]))
+        record_tokens(model, 'completion', estimate_tokens([content]))
+
+def cached_invoke(prompt, model, temperature, parse=None):
+    """Return the LLM's reply to prompt, serving repeats from the local cache.
+
+    With ``parse``, the parsed reply is returned instead, and a reply that
+    fails to parse is never cached.
+    """
+    params = {'model': model, 'temperature': temperature}
+    key = cache_key(params, prompt)
+
+    content = lookup(key)
+    if content is not None:
+        return parse(content) if parse else content
+
+    throttle_openai(model, [prompt])
+    message = get_chat_model(model, temperature).invoke(prompt)
+    content = message.content
+    record_usage(model, prompt, content, getattr(message, 'usage_metadata', None))
+    result = parse(content) if parse else content
+    store(key, content)
+    return result
+
+def cached_stream(prompt, model, temperature):
+    """Yield the LLM's reply as it is generated; a cached reply comes in one piece."""
+    params = {'model': model, 'temperature': temperature}
+    key = cache_key(params, prompt)
+
+    content = lookup(key)
+    if content is not None:
+        yield content
+        return
+
+    throttle_openai(model, [prompt])
+    parts = []
+    usage = None
+    for chunk in get_chat_model(model, temperature).stream(prompt):
+        # Providers that report streaming usage attach it to the final chunk
+        usage = getattr(chunk, 'usage_metadata', None) or usage
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    content = ''.join(parts)
+    record_usage(model, prompt, content, usage)
+    store(key, content)
+
+def stats():
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,93 @@
+import arxiv
+import json
+import os
+import threading
+from .clients import get_arxiv_client
+
+CACHE_PATH = "data/metadata_cache.json"
+
+_lock = threading.Lock()
+_cache = None
+
+def paper_from_result(result):
+    """Convert an arxiv.Result into the paper dict used throughout the pipeline."""
+    return {
+        'arxiv_id': result.get_short_id(),
+        'title': result.title,
+        'authors': [author.name for author in result.authors],
+        'published': result.published.strftime("%Y-%m-%d"),
+        'summary': result.summary,
+        'pdf_url': result.pdf_url
+    }
+
+def _load():
+    global _cache
+    if _cache is None:
+        try:
+            with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+                _cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _cache = {}
+    return _cache
+
+def _save():
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_cache, f)
+    os.replace(tmp_path, CACHE_PATH)
+
+def _base_id(arxiv_id):
+    """Strip the version suffix so 2401.01234v2 and 2401.01234 share an entry."""
+    head, sep, tail = arxiv_id.rpartition('v')
+    if sep and head and tail.isdigit() and not head.endswith('/'):
+        return head
+    return arxiv_id
+
+def remember_papers(papers):
+    """Store paper dicts returned by a search so later stages never re-query them."""
+    with _lock:
+        cache = _load()
+        for paper in papers:
+            cache[_base_id(paper['arxiv_id'])] = paper
+        _save()
+
+def lookup_papers(arxiv_ids):
+    """Return {arxiv_id: paper} for the given IDs.
+
+    Cached entries are served from disk; all misses are resolved with a single
+    batched id_list query.
+    """
+    with _lock:
+        cache = _load()
+        found = {}
+        missing = []
+        for arxiv_id in arxiv_ids:
+            paper = cache.get(_base_id(arxiv_id))
+            if paper is not None:
+                found[arxiv_id] = paper
+            else:
+                missing.append(arxiv_id)
+
+        if missing:
+            client = get_arxiv_client()
+            search = arxiv.Search(id_list=missing, max_results=len(missing))
+            fetched = {}
+            for result in client.results(search):
+                paper = paper_from_result(result)
+                fetched[_base_id(paper['arxiv_id'])] = paper
+                cache[_base_id(paper['arxiv_id'])] = paper
+            for arxiv_id in missing:
+                paper = fetched.get(_base_id(arxiv_id))
+                if paper is not None:
+                    found[arxiv_id] = paper
+            if fetched:
+                _save()
+
+        return found
+
+def lookup_paper(arxiv_id):
+    paper = lookup_papers([arxiv_id]).get(arxiv_id)
+    if paper is None:
+        raise Exception(f"Paper {arxiv_id} not found on ArXiv")
+    return paper
@@ -0,0 +1,159 @@
+import threading
+import time
+from contextlib import contextmanager
+from .logger import log_info, log_step
+
+# Seconds; spans range from cache lookups to multi-minute report runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self.lock:
+            counts, total = self.series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.series[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total) in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels, key, [('le', _format_number(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+                lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+class Gauge:
+    """A gauge whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name, help, labels, read):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.read = read
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.read().items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}")
+        return lines
+
+_metrics = []
+_metrics_lock = threading.Lock()
+
+def _register(metric):
+    with _metrics_lock:
+        _metrics.append(metric)
+    return metric
+
+def gauge(name, help, labels, read):
+    return _register(Gauge(name, help, labels, read))
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _metrics_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+STAGE_SECONDS = _register(Histogram(
+    'composer_stage_seconds', 'Duration of report pipeline stages.', ('stage',)
+))
+STAGE_ERRORS = _register(Counter(
+    'composer_stage_errors_total', 'Pipeline stages that raised.', ('stage',)
+))
+CACHE_REQUESTS = _register(Counter(
+    'composer_cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result')
+))
+RETRIES = _register(Counter(
+    'composer_retries_total', 'Retried calls to external services.', ('target',)
+))
+DOWNLOADED_BYTES = _register(Counter(
+    'composer_downloaded_bytes_total', 'Bytes of PDFs downloaded.'
+))
+TOKENS = _register(Counter(
+    'composer_llm_tokens_total', 'Model tokens by model and kind (prompt, completion, embedding).', ('model', 'kind')
+))
+REPORTS = _register(Counter(
+    'composer_reports_total', 'Finished report runs by outcome.', ('status',)
+))
+
+@contextmanager
+def span(stage, log=True):
+    """Time a pipeline stage into composer_stage_seconds.
+
+    With ``log``, the stage start and its duration also go to the console.
+    """
+    if log:
+        log_step(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+    if log:
+        log_info(f"{stage} took {elapsed:.2f}s")
+
+def observe_stage(stage, seconds):
+    """Record a stage timed elsewhere, e.g. in a worker process."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+def record_tokens(model, kind, count):
+    if count:
+        TOKENS.inc(count, model=model, kind=kind)
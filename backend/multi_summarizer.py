@@ -1,18 +1,46 @@
 import os
-from langchain_openai import ChatOpenAI
 from .config_loader import config
+from .llm_cache import cached_invoke, cached_stream
+from .context_packer import format_passage, pack_context
 from .indexers import get_indexer
-
-def summarize_multiple_papers(papers_data, topic, query_spec=None):
-    indexer_type = config.get('indexer', 'type')
-    chunk_size = config.get('indexer', 'chunk_size')
-    chunk_overlap = config.get('indexer', 'chunk_overlap')
-    top_k = config.get('indexer', 'top_k')
+from .metrics import span
+from .summarizer import summarize_papers
+
+# Bump whenever the synthesis prompts change so cached reports are regenerated
+PROMPT_VERSION = 1
+
+def summarize_multiple_papers(papers_data, topic, query_spec=None, cfg=config, warnings=None):
+    prompt = build_synthesis_prompt(papers_data, topic, query_spec, cfg, warnings)
+    return cached_invoke(prompt, cfg.get('llm', 'model'), cfg.get('llm', 'temperature'))
+
+def stream_multiple_papers(papers_data, topic, query_spec=None, cfg=config, warnings=None):
+    """Like summarize_multiple_papers, but yields the report as tokens arrive."""
+    prompt = build_synthesis_prompt(papers_data, topic, query_spec, cfg, warnings)
+    yield from cached_stream(prompt, cfg.get('llm', 'model'), cfg.get('llm', 'temperature'))
+
+def synthesis_mode(n_papers, cfg=config):
+    """'retrieval' or 'map_reduce'; 'auto' switches to map-reduce for larger paper sets."""
+    mode = cfg.get('synthesis', 'mode')
+    if mode == 'auto':
+        return 'map_reduce' if n_papers >= cfg.get('synthesis', 'map_reduce_min_papers') else 'retrieval'
+    return mode
+
+def _retrieved_context(indexer, papers_data, topic, top_k, cfg):
+    arxiv_ids = [p['metadata']['arxiv_id'] for p in papers_data]
+    query = f"Research about {topic}"
     
-    indexer = get_indexer(indexer_type, chunk_size, chunk_overlap)
-    indexer.index(papers_data)
+    if cfg.get('context', 'pack'):
+        # Over-retrieve, then pack the best non-redundant passages into the token budget
+        relevant_docs = indexer.retrieve(query, cfg.get('context', 'candidates'), arxiv_ids)
+        passages = pack_context(
+            relevant_docs,
+            cfg.get('context', 'budget_tokens'),
+            cfg.get('context', 'dedup_threshold'),
+            cfg.get('context', 'mmr_lambda')
+        )
+        return "\n\n".join([format_passage(p) for p in passages])
     
-    relevant_docs = indexer.retrieve(f"Research about {topic}", top_k)
+    relevant_docs = indexer.retrieve(query, top_k, arxiv_ids)
     
     context_parts = []
     for doc in relevant_docs:
@@ -24,18 +52,40 @@ def summarize_multiple_papers(papers_data, topic, query_spec=None):
             content = doc['page_content']
         context_parts.append(f"[From: {title}]\n{content}")
     
-    context = "\n\n".join(context_parts)
+    return "\n\n".join(context_parts)
+
+def build_synthesis_prompt(papers_data, topic, query_spec=None, cfg=config, warnings=None):
+    """Index the papers, gather context for the topic and build the report prompt.
+
+    Degraded inputs, such as per-paper summaries that fell back to raw text,
+    are reported by appending to ``warnings``.
+    """
+    indexer_type = cfg.get('indexer', 'type')
+    chunk_size = cfg.get('indexer', 'chunk_size')
+    chunk_overlap = cfg.get('indexer', 'chunk_overlap')
+    top_k = cfg.get('indexer', 'top_k')
+    
+    with span('index', log=False):
+        indexer = get_indexer(indexer_type, chunk_size, chunk_overlap, cfg)
+        indexer.index(papers_data)
+    
+    if synthesis_mode(len(papers_data), cfg) == 'map_reduce':
+        # Map: one summary per paper; the prompt below is the reduce step
+        with span('map_summaries', log=False):
+            summaries = summarize_papers(papers_data, indexer, cfg, warnings)
+        context = "\n\n".join([
+            f"[Paper {i+1}: {p['metadata']['title']}]\n{summary}"
+            for i, (p, summary) in enumerate(zip(papers_data, summaries))
+        ])
+    else:
+        with span('retrieve', log=False):
+            context = _retrieved_context(indexer, papers_data, topic, top_k, cfg)
     
     paper_list = "\n".join([
         f"- {p['metadata']['title']} (arXiv:{p['metadata']['arxiv_id']})"
         for p in papers_data
     ])
     
-    model_name = config.get('llm', 'model')
-    temperature = config.get('llm', 'temperature')
-    
-    llm = ChatOpenAI(model=model_name, temperature=temperature)
-    
     citation_map = "\n".join([f"Paper {i+1}: {p['metadata']['title']}" for i, p in enumerate(papers_data)])
     
     if query_spec:
@@ -113,5 +163,4 @@ Generate the report in LaTeX format following these requirements:
 
 5. Properly escape special LaTeX characters"""
     
-    response = llm.invoke(prompt)
-    return response.content
+    return prompt
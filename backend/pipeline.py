@@ -0,0 +1,343 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from .config_loader import config
+from .fetcher import fetch_paper
+from .logger import log_warning
+from .extractor import paper_metadata, cache_version, timed_extract
+from . import metrics, report_cache, text_cache
+from .concurrency import single_flight
+from .metadata import lookup_papers
+from .multi_summarizer import summarize_multiple_papers, stream_multiple_papers
+from .preview import LatexPreviewer, latex_to_preview
+from .query_processor import process_user_query
+from .ranker import rank_papers
+from .report_generator import generate_report_pdf
+from .searcher import search_papers
+
+_fetch_pool = None
+_extract_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pools():
+    """Create the download and parsing pools once and reuse them across requests."""
+    global _fetch_pool, _extract_pool
+    with _pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(
+                max_workers=config.get('pipeline', 'fetch_workers'),
+                thread_name_prefix='fetch'
+            )
+        if _extract_pool is None:
+            # Forking this multi-threaded process could copy a lock some other thread holds
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=config.get('pipeline', 'extract_workers'),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _fetch_pool, _extract_pool
+
+def _reset_extract_pool():
+    global _extract_pool
+    with _pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+
+def _extract_options():
+    return {
+        'max_pages': config.get('extraction', 'max_pages'),
+        'stop_at_references': config.get('extraction', 'stop_at_references'),
+        'workers': config.get('extraction', 'page_workers'),
+        'parallel_min_pages': config.get('extraction', 'parallel_min_pages')
+    }
+
+def _fetch_and_probe(paper, version):
+    """Download a paper and look its text up in the cache, off the request thread."""
+    with metrics.span('fetch', log=False):
+        pdf_path = fetch_paper(paper)
+    content_hash = text_cache.hash_file(pdf_path)
+    return pdf_path, content_hash, text_cache.get(content_hash, version)
+
+def fetch_and_extract(papers, on_result=None):
+    """Download papers on a thread pool and parse them on a process pool.
+
+    PDFs whose content hash is already in the text cache skip parsing. Returns
+    one result dict per input paper, in the original order, with either
+    'text'/'metadata' or 'error' set. ``on_result(index, result)`` is called
+    as each paper finishes, in completion order.
+    """
+    fetch_pool, extract_pool = _get_pools()
+    options = _extract_options()
+    version = cache_version(options['max_pages'], options['stop_at_references'])
+
+    # Papers given without search metadata are resolved in one batched lookup
+    bare_ids = [p['arxiv_id'] for p in papers if not p.get('pdf_url')]
+    if bare_ids:
+        try:
+            known = lookup_papers(bare_ids)
+            papers = [known.get(p['arxiv_id'], p) if not p.get('pdf_url') else p for p in papers]
+        except Exception as e:
+            # fetch_paper falls back to a per-paper lookup for the ids left bare
+            log_warning(f"Batched metadata lookup failed for {len(bare_ids)} papers: {e}")
+
+    fetch_futures = {
+        fetch_pool.submit(_fetch_and_probe, paper, version): idx
+        for idx, paper in enumerate(papers)
+    }
+
+    results = [None] * len(papers)
+    hashes = [None] * len(papers)
+    extract_futures = {}
+
+    def finish(idx, result):
+        result['paper'] = papers[idx]
+        results[idx] = result
+        if on_result is not None:
+            on_result(idx, result)
+
+    # Hand each PDF to the parser as soon as its download finishes
+    for future in as_completed(fetch_futures):
+        idx = fetch_futures[future]
+        try:
+            pdf_path, hashes[idx], cached_text = future.result()
+            if cached_text is not None:
+                finish(idx, {
+                    'status': 'success',
+                    'text': cached_text,
+                    'metadata': paper_metadata(pdf_path, papers[idx])
+                })
+                continue
+        except Exception as e:
+            finish(idx, {'status': 'error', 'error': str(e)})
+            continue
+        try:
+            extract_futures[extract_pool.submit(timed_extract, pdf_path, papers[idx], **options)] = idx
+        except BrokenProcessPool:
+            _reset_extract_pool()
+            _, extract_pool = _get_pools()
+            extract_futures[extract_pool.submit(timed_extract, pdf_path, papers[idx], **options)] = idx
+
+    broken = False
+    for future in as_completed(extract_futures):
+        idx = extract_futures[future]
+        try:
+            text, metadata, seconds = future.result()
+        except BrokenProcessPool as e:
+            broken = True
+            finish(idx, {'status': 'error', 'error': f"PDF parser crashed: {e}"})
+            continue
+        except Exception as e:
+            finish(idx, {'status': 'error', 'error': str(e)})
+            continue
+        metrics.observe_stage('extract', seconds)
+        finish(idx, {'status': 'success', 'text': text, 'metadata': metadata})
+        try:
+            text_cache.put(hashes[idx], version, text)
+        except OSError:
+            pass
+
+    if broken:
+        _reset_extract_pool()
+
+    return results
+
+class PipelineError(Exception):
+    """A report request that cannot be completed, with the HTTP status to report."""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _paper_summary(paper):
+    return {"title": paper["title"], "arxiv_id": paper["arxiv_id"]}
+
+def request_overrides(request):
+    """Per-request config overrides carried by a generate-advanced request."""
+    overrides = {}
+    if request.get("llm_model"):
+        overrides["llm"] = {"model": request["llm_model"]}
+    if request.get("embedding_model"):
+        overrides["embeddings"] = {"model": request["embedding_model"]}
+    if request.get("indexer_type"):
+        overrides["indexer"] = {"type": request["indexer_type"]}
+    if request.get("top_papers"):
+        overrides["search"] = {"top_papers": request["top_papers"]}
+    return overrides
+
+def generate_report(request, emit=None):
+    """Run the full report pipeline for a generate-advanced request.
+
+    ``emit(event, data)`` receives progress events as the pipeline runs:
+    'stage' when a stage starts or finishes, 'papers' once ranking is done,
+    and 'paper' as each paper is fetched and extracted. Returns the response
+    payload; raises PipelineError for requests that cannot be served.
+    """
+    if emit is None:
+        emit = lambda event, data: None
+
+    try:
+        with metrics.span("report"):
+            response = _run_report(request, emit)
+    except Exception:
+        metrics.REPORTS.inc(status="error")
+        raise
+    metrics.REPORTS.inc(status="success")
+    return response
+
+def _run_report(request, emit):
+    user_query = request.get("user_query", "")
+    if not user_query:
+        raise PipelineError("User query is required", 400)
+    
+    # Overrides apply to this request only; the shared base config never changes
+    cfg = config.snapshot(request_overrides(request))
+    
+    # The UI analyzes the query first and passes the spec along; don't redo it
+    query_spec = request.get("query_spec")
+    if not isinstance(query_spec, dict) or not query_spec.get("search_query"):
+        emit("stage", {"stage": "query", "status": "started"})
+        with metrics.span("query"):
+            query_spec = process_user_query(user_query, cfg)
+    search_query = query_spec.get("search_query", user_query)
+    emit("stage", {"stage": "query", "status": "done", "query_spec": query_spec})
+    
+    os.makedirs("data/papers", exist_ok=True)
+    os.makedirs("data/outputs", exist_ok=True)
+    
+    emit("stage", {"stage": "search", "status": "started", "search_query": search_query})
+    with metrics.span("search"):
+        papers = search_papers(search_query, cfg=cfg)
+    emit("stage", {"stage": "search", "status": "done", "count": len(papers)})
+    
+    if not papers:
+        raise PipelineError(f"No papers found for query: {search_query}", 404)
+    
+    emit("stage", {"stage": "rank", "status": "started"})
+    top_n = cfg.get("search", "top_papers")
+    with metrics.span("rank"):
+        top_papers = rank_papers(papers, search_query, top_n, query_spec.get("themes"), cfg)
+    emit("stage", {"stage": "rank", "status": "done"})
+    emit("papers", {"papers": [_paper_summary(p) for p in top_papers]})
+    
+    paper_ids = [p['arxiv_id'] for p in top_papers]
+    key = report_cache.report_key(search_query, query_spec, paper_ids, cfg)
+    
+    def cached_or_build():
+        cached = report_cache.load(key)
+        metrics.cache_result("report", cached is not None)
+        if cached is None:
+            return _build_report(top_papers, search_query, query_spec, key, emit, cfg)
+        
+        response = cached['response']
+        output_path = f"data/outputs/{response['filename']}"
+        if not os.path.exists(output_path):
+            generate_report_pdf(cached['report'], top_papers, search_query, output_path)
+        emit("stage", {"stage": "cache", "status": "hit"})
+        return response
+    
+    # Concurrent requests for the same report wait for a single run
+    response, leader = single_flight(key, cached_or_build)
+    if not leader:
+        metrics.CACHE_REQUESTS.inc(cache="report", result="coalesced")
+        emit("stage", {"stage": "cache", "status": "coalesced"})
+    return response
+
+def _stream_report(papers_data, search_query, query_spec, emit, cfg, warnings):
+    """Generate the report token by token, emitting 'preview' text as lines complete."""
+    previewer = LatexPreviewer()
+    parts = []
+    for token in stream_multiple_papers(papers_data, search_query, query_spec, cfg, warnings):
+        parts.append(token)
+        text = previewer.feed(token)
+        if text:
+            emit("preview", {"text": text})
+    text = previewer.close()
+    if text:
+        emit("preview", {"text": text})
+    return ''.join(parts)
+
+def _build_report(top_papers, search_query, query_spec, key, emit, cfg):
+    progress_info = {
+        "total_papers": len(top_papers),
+        "papers_list": [_paper_summary(p) for p in top_papers]
+    }
+    
+    def paper_done(idx, result):
+        entry = {"index": idx + 1, **_paper_summary(result['paper']), "status": result['status']}
+        if result['status'] == 'error':
+            entry["error"] = result['error']
+        emit("paper", entry)
+    
+    emit("stage", {"stage": "fetch", "status": "started", "total": len(top_papers)})
+    with metrics.span("fetch_and_extract"):
+        results = fetch_and_extract(top_papers, on_result=paper_done)
+    emit("stage", {"stage": "fetch", "status": "done"})
+    
+    papers_data = []
+    errors = []
+    processed_papers = []
+    
+    for idx, result in enumerate(results, 1):
+        paper = result['paper']
+        arxiv_id = paper['arxiv_id']
+        if result['status'] == 'success':
+            papers_data.append({
+                'text': result['text'],
+                'metadata': result['metadata']
+            })
+            processed_papers.append({
+                "index": idx,
+                "title": paper["title"],
+                "arxiv_id": arxiv_id,
+                "status": "success"
+            })
+        else:
+            error_msg = f"Failed to process {arxiv_id}: {result['error']}"
+            errors.append(error_msg)
+            processed_papers.append({
+                "index": idx,
+                "title": paper["title"],
+                "arxiv_id": arxiv_id,
+                "status": "error",
+                "error": result['error']
+            })
+    
+    if not papers_data:
+        raise PipelineError(f"Failed to fetch any papers. Errors: {'; '.join(errors)}", 500)
+    
+    emit("stage", {"stage": "synthesis", "status": "started"})
+    # Fallbacks taken during synthesis count as errors, so the report is not cached
+    with metrics.span("synthesis"):
+        if cfg.get("llm", "stream"):
+            report = _stream_report(papers_data, search_query, query_spec, emit, cfg, errors)
+        else:
+            report = summarize_multiple_papers(papers_data, search_query, query_spec, cfg, errors)
+    emit("stage", {"stage": "synthesis", "status": "done"})
+    
+    # The key suffix keeps different queries with the same slug from overwriting each other
+    topic_slug = search_query.replace(' ', '_')[:50]
+    output_filename = f"{topic_slug}_{key[:10]}_report.pdf"
+    output_path = f"data/outputs/{output_filename}"
+    emit("stage", {"stage": "compile", "status": "started"})
+    with metrics.span("compile"):
+        latex_errors = generate_report_pdf(report, top_papers, search_query, output_path)
+    emit("stage", {"stage": "compile", "status": "done"})
+    warnings = errors + [f"LaTeX: {error}" for error in latex_errors]
+    
+    response = {
+        "status": "success",
+        "filename": output_filename,
+        "papers": [_paper_summary(p) for p in top_papers],
+        "processed_papers": processed_papers,
+        "query_spec": query_spec,
+        "report_preview": latex_to_preview(report)[:8000],  # Limit preview size
+        "warnings": warnings if warnings else None,
+        "progress_info": progress_info
+    }
+    
+    # Reports built from a partial paper set are not cached, so a retry can do better
+    if not errors:
+        report_cache.store(key, report, response)
+    return response
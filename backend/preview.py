@@ -0,0 +1,62 @@
+import re
+
+# A command with an optional argument that may itself contain one level of braces
+_COMMAND = re.compile(r'\\([a-zA-Z]+)(?:\{((?:[^{}]|\{[^{}]*\})*)\})?')
+
+# Text ending in an unterminated command could still change, so it is held back
+_INCOMPLETE_TAIL = re.compile(r'\\[a-zA-Z]*(?:\{[^}]*)?$')
+
+_DROPPED_ENVIRONMENTS = ('abstract',)
+
+def _replace(match):
+    name, argument = match.group(1), match.group(2)
+    if argument is None:
+        return ''
+    if name in ('begin', 'end') and argument in _DROPPED_ENVIRONMENTS:
+        return ''
+    argument = _COMMAND.sub(_replace, argument)
+    if name == 'section':
+        return f'\n\n═══ {argument} ═══\n'
+    if name == 'subsection':
+        return f'\n── {argument} ──\n'
+    if name == 'cite':
+        return f'[{argument}]'
+    return argument
+
+def latex_to_preview(latex):
+    """Plain-text preview of a LaTeX report body in a single regex pass."""
+    return _COMMAND.sub(_replace, latex).strip()
+
+class LatexPreviewer:
+    """Incremental LaTeX-to-preview converter for streamed report text.
+
+    ``feed`` takes the next piece of LaTeX and returns the preview text that
+    is now final. Input is converted up to the last complete line, and never
+    past an unterminated command. ``close`` flushes whatever is left.
+    """
+
+    def __init__(self):
+        self.pending = ''
+        self.started = False
+
+    def _convert(self, latex):
+        text = _COMMAND.sub(_replace, latex)
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
+
+    def feed(self, chunk):
+        self.pending += chunk
+        cut = self.pending.rfind('\n') + 1
+        tail = _INCOMPLETE_TAIL.search(self.pending, 0, cut) if cut else None
+        if tail is not None:
+            cut = tail.start()
+        if cut <= 0:
+            return ''
+        ready, self.pending = self.pending[:cut], self.pending[cut:]
+        return self._convert(ready)
+
+    def close(self):
+        ready, self.pending = self.pending, ''
+        return self._convert(ready).rstrip()
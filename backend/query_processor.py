@@ -1,12 +1,10 @@
-from langchain_openai import ChatOpenAI
 from .config_loader import config
+from .llm_cache import cached_invoke
 import json
 
-def process_user_query(user_input):
-    model_name = config.get('llm', 'model')
-    temperature = config.get('llm', 'temperature')
-    
-    llm = ChatOpenAI(model=model_name, temperature=0.7)
+def process_user_query(user_input, cfg=config):
+    model_name = cfg.get('llm', 'model')
+    temperature = cfg.get('llm', 'temperature')
     
     prompt = f"""You are a research paper query optimizer. Analyze the user's requirements and extract:
 1. The core research topic for ArXiv search
@@ -32,13 +30,13 @@ Example:
 
 Respond ONLY with valid JSON, no additional text."""
     
-    response = llm.invoke(prompt)
-    
+    return cached_invoke(prompt, model_name, temperature, parse=_parse_query_spec)
+
+def _parse_query_spec(content):
     try:
-        parsed = json.loads(response.content)
+        parsed = json.loads(content)
         return parsed
     except json.JSONDecodeError:
-        content = response.content
         if "```json" in content:
             content = content.split("```json")[1].split("```")[0]
         elif "```" in content:
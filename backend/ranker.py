@@ -1,30 +1,59 @@
-from langchain_openai import OpenAIEmbeddings
 from .config_loader import config
+from .embedding_cache import get_embedding_store
+from .bm25 import bm25_scores
+from .scoring import normalize_rows, top_k_indices
 import numpy as np
 
-def rank_papers(papers, topic, top_k=None):
+def score_papers(paper_matrix, query_matrix, query_weights=None):
+    """Cosine similarity of every paper to every query, combined per paper.
+
+    All queries are scored against the normalized paper matrix with a single
+    matrix product; the per-query scores are then averaged with
+    ``query_weights``.
+    """
+    similarities = normalize_rows(query_matrix) @ normalize_rows(paper_matrix).T
+    if query_weights is None:
+        return similarities.mean(axis=0)
+    weights = np.asarray(query_weights, dtype=np.float32)
+    return weights @ similarities / weights.sum()
+
+def rank_papers(papers, topic, top_k=None, themes=None, cfg=config):
+    """Rank papers by embedding similarity to the topic and optional themes.
+
+    With ``ranking.prefilter`` enabled, a BM25 pass over titles and abstracts
+    first narrows the candidates to ``ranking.prefilter_k``.
+    """
     if top_k is None:
-        top_k = config.get('search', 'top_papers')
-    
-    embedding_model = config.get('embeddings', 'model')
-    embeddings = OpenAIEmbeddings(model=embedding_model)
-    
-    topic_embedding = embeddings.embed_query(topic)
-    
+        top_k = cfg.get('search', 'top_papers')
+    if not papers:
+        return []
+
+    themes = [t for t in (themes or []) if t]
+    queries = [topic] + themes
+    weights = [1.0]
+    if themes:
+        theme_weight = cfg.get('ranking', 'theme_weight')
+        weights += [theme_weight / len(themes)] * len(themes)
+
     paper_texts = [
         f"{p['title']} {p['summary']}" for p in papers
     ]
-    paper_embeddings = embeddings.embed_documents(paper_texts)
-    
-    similarities = []
-    for paper_emb in paper_embeddings:
-        similarity = np.dot(topic_embedding, paper_emb) / (
-            np.linalg.norm(topic_embedding) * np.linalg.norm(paper_emb)
-        )
-        similarities.append(similarity)
-    
-    ranked_indices = np.argsort(similarities)[::-1][:top_k]
-    
-    ranked_papers = [papers[i] for i in ranked_indices]
-    
-    return ranked_papers
+
+    # Cheap BM25 pass so only the best lexical candidates get embedded
+    prefilter_k = cfg.get('ranking', 'prefilter_k')
+    if cfg.get('ranking', 'prefilter') and len(papers) > max(prefilter_k, top_k):
+        lexical_scores = bm25_scores(paper_texts, ' '.join(queries))
+        keep = top_k_indices(lexical_scores, max(prefilter_k, top_k))
+        papers = [papers[i] for i in keep]
+        paper_texts = [paper_texts[i] for i in keep]
+
+    # Queries and papers go through the embedding store in one call
+    store = get_embedding_store(cfg.get('embeddings', 'model'))
+    vectors = store.embed(queries + paper_texts)
+    query_matrix = vectors[:len(queries)]
+    paper_matrix = vectors[len(queries):]
+
+    scores = score_papers(paper_matrix, query_matrix, weights)
+    ranked_indices = top_k_indices(scores, top_k)
+
+    return [papers[i] for i in ranked_indices]
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import threading
+from .config_loader import config
+from .extractor import cache_version
+from .multi_summarizer import PROMPT_VERSION, synthesis_mode
+from .summarizer import SUMMARY_PROMPT_VERSION
+
+CACHE_DIR = "data/report_cache"
+
+def report_key(search_query, query_spec, paper_ids, cfg=config):
+    """Content hash of everything that determines a report's text."""
+    parts = {
+        'search_query': ' '.join(search_query.lower().split()),
+        'query_spec': query_spec,
+        'paper_ids': list(paper_ids),
+        'llm_model': cfg.get('llm', 'model'),
+        'temperature': cfg.get('llm', 'temperature'),
+        'embedding_model': cfg.get('embeddings', 'model'),
+        # Every indexer setting can change which passages reach the prompt
+        'indexer': cfg.get('indexer'),
+        # Page budget, reference stripping and extractor version shape the text itself
+        'extraction': cache_version(
+            cfg.get('extraction', 'max_pages'),
+            cfg.get('extraction', 'stop_at_references')
+        ),
+        'context': cfg.get('context'),
+        'synthesis': {
+            'mode': synthesis_mode(len(paper_ids), cfg),
+            'summary_chunks': cfg.get('synthesis', 'summary_chunks')
+        },
+        'prompt_version': [PROMPT_VERSION, SUMMARY_PROMPT_VERSION]
+    }
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def load(key):
+    """Return the cached {'report': latex, 'response': payload} entry, or None."""
+    try:
+        with open(_entry_path(key), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def store(key, report, response):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'report': report, 'response': response}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -1,6 +1,45 @@
+import hashlib
 import os
+import re
+import shutil
 import subprocess
+import tempfile
+import threading
 from datetime import datetime
+from .config_loader import config
+
+PREAMBLE = r"""\documentclass[11pt,a4paper]{article}
+\usepackage[utf8]{inputenc}
+\usepackage[margin=1in]{geometry}
+\usepackage{hyperref}
+\usepackage{graphicx}
+\usepackage{amsmath}
+\usepackage{cite}
+\usepackage{abstract}
+"""
+
+FORMAT_DIR = "data/latex_format"
+AUX_DIR = "data/outputs/.aux"
+
+# Aux lines that change what the next pass typesets
+_REFERENCE_LINE = re.compile(r'^\\(?:bibcite|newlabel|@writefile)\b.*$', re.MULTILINE)
+_RERUN_REQUEST = re.compile(r'Rerun to get|Label\(s\) may have changed')
+_LOG_ERROR = re.compile(r'^! .*$', re.MULTILINE)
+
+class LatexError(Exception):
+    pass
+
+_build_slots = None
+_format_name = None
+_format_lock = threading.Lock()
+_slots_lock = threading.Lock()
+
+def _get_build_slots():
+    global _build_slots
+    with _slots_lock:
+        if _build_slots is None:
+            _build_slots = threading.BoundedSemaphore(config.get('latex', 'max_concurrent'))
+        return _build_slots
 
 def escape_latex(text):
     replacements = {
@@ -18,7 +57,144 @@ def escape_latex(text):
         text = text.replace(char, replacement)
     return text
 
+def _run_pdflatex(args, cwd, env=None):
+    timeout = config.get('latex', 'timeout_s')
+    try:
+        return subprocess.run(
+            ['pdflatex', '-interaction=nonstopmode', *args],
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=timeout
+        )
+    except FileNotFoundError:
+        raise LatexError("pdflatex not found; install a LaTeX distribution to build PDFs")
+    except subprocess.TimeoutExpired:
+        raise LatexError(f"pdflatex timed out after {timeout}s")
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+def _tex_version():
+    """``pdflatex --version`` output, or None when it cannot be run."""
+    try:
+        result = subprocess.run(
+            ['pdflatex', '--version'],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=config.get('latex', 'timeout_s')
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+def _preamble_format():
+    """Dump the fixed preamble into a format file once, returning its name or None.
+
+    Loading the format skips package loading on every build. The name is a
+    hash of the preamble and the ``pdflatex --version`` output, so editing
+    the preamble or upgrading TeX builds a new format; a failed dump falls
+    back to compiling the full preamble.
+    """
+    global _format_name
+    if not config.get('latex', 'preamble_format'):
+        return None
+    with _format_lock:
+        if _format_name is not None:
+            return _format_name or None
+
+        version = _tex_version()
+        if version is None:
+            _format_name = False
+            return None
+        digest = hashlib.sha256(PREAMBLE.encode('utf-8') + version).hexdigest()[:12]
+        name = f"preamble_{digest}"
+        if os.path.exists(os.path.join(FORMAT_DIR, f"{name}.fmt")):
+            _format_name = name
+            return name
+
+        os.makedirs(FORMAT_DIR, exist_ok=True)
+        build_dir = tempfile.mkdtemp(dir=FORMAT_DIR)
+        try:
+            with open(os.path.join(build_dir, f"{name}.tex"), 'w', encoding='utf-8') as f:
+                f.write(PREAMBLE + "\\dump\n")
+            _run_pdflatex(['-ini', f'-jobname={name}', '&pdflatex', f"{name}.tex"], build_dir)
+            os.replace(os.path.join(build_dir, f"{name}.fmt"), os.path.join(FORMAT_DIR, f"{name}.fmt"))
+            _format_name = name
+        except (LatexError, OSError):
+            _format_name = False
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return _format_name or None
+
+def _disable_format():
+    """Compile with the inline preamble from now on; the format file does not work here."""
+    global _format_name
+    with _format_lock:
+        _format_name = False
+
+def _reference_state(aux_text):
+    return _REFERENCE_LINE.findall(aux_text)
+
+def _compile(latex_body, build_dir, job_name, aux_seed):
+    """Compile the report, with the preamble format when there is one; return the last log.
+
+    A format that no longer matches the installed engine fails every build,
+    so when a build with it produces no PDF it is retried once with the
+    inline preamble, and the format is dropped if that works.
+    """
+    fmt = _preamble_format()
+    log = _run_passes(latex_body, build_dir, job_name, aux_seed, fmt)
+    if fmt and not os.path.exists(os.path.join(build_dir, f"{job_name}.pdf")):
+        log = _run_passes(latex_body, build_dir, job_name, aux_seed, None)
+        if os.path.exists(os.path.join(build_dir, f"{job_name}.pdf")):
+            _disable_format()
+    return log
+
+def _run_passes(latex_body, build_dir, job_name, aux_seed, fmt):
+    """Run pdflatex until references settle; return the log of the last pass."""
+    args = []
+    env = None
+    if fmt:
+        env = dict(os.environ, TEXFORMATS=f"{os.path.abspath(FORMAT_DIR)}{os.pathsep}")
+        args.append(f'-fmt={fmt}')
+        source = latex_body
+    else:
+        source = PREAMBLE + latex_body
+
+    with open(os.path.join(build_dir, f"{job_name}.tex"), 'w', encoding='utf-8') as f:
+        f.write(source)
+
+    aux_path = os.path.join(build_dir, f"{job_name}.aux")
+    log_path = os.path.join(build_dir, f"{job_name}.log")
+    if aux_seed:
+        shutil.copyfile(aux_seed, aux_path)
+    elif os.path.exists(aux_path):
+        os.remove(aux_path)
+
+    log = ''
+    for _ in range(config.get('latex', 'max_passes')):
+        before = _reference_state(_read(aux_path))
+        result = _run_pdflatex([*args, f"{job_name}.tex"], build_dir, env)
+        log = _read(log_path) or result.stdout.decode('utf-8', 'replace')
+        # A second pass is only needed when citations or labels moved
+        if _reference_state(_read(aux_path)) == before and not _RERUN_REQUEST.search(log):
+            break
+    return log
+
 def generate_report_pdf(report_content, papers, topic, output_path):
+    """Compile the report to output_path and return the LaTeX errors it recovered from.
+
+    Each build runs in its own temporary directory and the finished PDF is
+    moved into place atomically. Concurrent builds are capped by
+    latex.max_concurrent and every pdflatex run by latex.timeout_s.
+    Raises LatexError with the log's error lines when no PDF is produced.
+    """
     bibliography = ""
     for i, paper in enumerate(papers, 1):
         title = escape_latex(paper['title'])
@@ -29,23 +205,15 @@ def generate_report_pdf(report_content, papers, topic, output_path):
             authors = escape_latex(', '.join(authors_list))
         arxiv_id = paper['arxiv_id']
         published = paper['published']
-        
+
         bibliography += f"""\\bibitem{{paper{i}}}
 {authors}.
 \\textit{{{title}}}.
 arXiv:{arxiv_id}, {published}.
 
 """
-    
-    latex_content = r"""\documentclass[11pt,a4paper]{article}
-\usepackage[utf8]{inputenc}
-\usepackage[margin=1in]{geometry}
-\usepackage{hyperref}
-\usepackage{graphicx}
-\usepackage{amsmath}
-\usepackage{cite}
-\usepackage{abstract}
 
+    latex_body = r"""
 \title{""" + escape_latex(topic) + r"""}
 \author{Generated by Composer AI}
 \date{""" + datetime.now().strftime('%Y-%m-%d') + r"""}
@@ -55,41 +223,43 @@ arXiv:{arxiv_id}, {published}.
 \maketitle
 
 """
-    
-    latex_content += report_content
-    
-    latex_content += r"""
+
+    latex_body += report_content
+
+    latex_body += r"""
 
 \begin{thebibliography}{99}
 """ + bibliography + r"""\end{thebibliography}
 
 \end{document}
 """
-    
-    base_path = output_path.replace('.pdf', '')
-    tex_file = base_path + '.tex'
-    
-    with open(tex_file, 'w', encoding='utf-8') as f:
-        f.write(latex_content)
-    
-    work_dir = os.path.dirname(tex_file) or '.'
-    tex_filename = os.path.basename(tex_file)
-    
-    subprocess.run(
-        ['pdflatex', '-interaction=nonstopmode', tex_filename],
-        cwd=work_dir,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-    
-    subprocess.run(
-        ['pdflatex', '-interaction=nonstopmode', tex_filename],
-        cwd=work_dir,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-    
-    for ext in ['.aux', '.log', '.out']:
-        cleanup_file = base_path + ext
-        if os.path.exists(cleanup_file):
-            os.remove(cleanup_file)
+
+    output_dir = os.path.dirname(output_path) or '.'
+    job_name = os.path.basename(output_path).replace('.pdf', '')
+    os.makedirs(AUX_DIR, exist_ok=True)
+    aux_stash = os.path.join(AUX_DIR, f"{job_name}.aux")
+
+    # Same filesystem as the output, so the final rename is atomic
+    build_dir = tempfile.mkdtemp(prefix=f".{job_name}.", dir=output_dir)
+    try:
+        with _get_build_slots():
+            log = _compile(latex_body, build_dir, job_name,
+                           aux_stash if os.path.exists(aux_stash) else None)
+
+        errors = _LOG_ERROR.findall(log)
+        pdf_path = os.path.join(build_dir, f"{job_name}.pdf")
+        if not os.path.exists(pdf_path):
+            raise LatexError("LaTeX compilation failed: " + (" | ".join(errors[:5]) or "no PDF produced"))
+
+        # Keep the final .aux so rebuilding the same report needs a single pass
+        aux_path = os.path.join(build_dir, f"{job_name}.aux")
+        if os.path.exists(aux_path):
+            os.replace(aux_path, aux_stash)
+        with open(os.path.join(build_dir, 'standalone.tex'), 'w', encoding='utf-8') as f:
+            f.write(PREAMBLE + latex_body)
+        os.replace(os.path.join(build_dir, 'standalone.tex'), output_path.replace('.pdf', '.tex'))
+        os.replace(pdf_path, output_path)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    return errors
@@ -0,0 +1,13 @@
+import numpy as np
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, without a full sort."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
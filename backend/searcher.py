@@ -1,26 +1,20 @@
 import arxiv
+from .clients import get_arxiv_client
 from .config_loader import config
+from .metadata import paper_from_result, remember_papers
 
-def search_papers(topic, max_results=None):
+def search_papers(topic, max_results=None, cfg=config):
     if max_results is None:
-        max_results = config.get('search', 'max_results')
+        max_results = cfg.get('search', 'max_results')
     
-    client = arxiv.Client()
+    client = get_arxiv_client()
     search = arxiv.Search(
         query=topic,
         max_results=max_results,
         sort_by=arxiv.SortCriterion.Relevance
     )
     
-    papers = []
-    for result in client.results(search):
-        papers.append({
-            'arxiv_id': result.get_short_id(),
-            'title': result.title,
-            'authors': [author.name for author in result.authors],
-            'published': result.published.strftime("%Y-%m-%d"),
-            'summary': result.summary,
-            'pdf_url': result.pdf_url
-        })
+    papers = [paper_from_result(result) for result in client.results(search)]
+    remember_papers(papers)
     
     return papers
@@ -1,45 +1,140 @@
-import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from .clients import get_chat_model, pause_openai, throttle_openai
 from .config_loader import config
+from .llm_cache import cache_key, lookup, record_usage, store
+from .logger import log_warning
+from .metrics import RETRIES, span
+
+# Bump whenever the per-paper summary prompt changes so cached summaries are regenerated
+SUMMARY_PROMPT_VERSION = 1
+
+# One fixed query for every paper, so its embedding is computed once
+SUMMARY_QUERY = "main objective, methodology, key findings and conclusion"
+
+MAX_RETRIES = 4
+
+# Provider hiccups worth another try; the SDK's own retries are turned off
+TRANSIENT_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError)
+
+class RateLimitedSlots:
+    """Caps concurrent LLM calls across all jobs.
+
+    When any call hits a rate limit, the model's shared scheduler is paused
+    for the Retry-After delay (or an exponential backoff), so every caller
+    backs off, not just the one that was rejected. Connection errors,
+    timeouts and server errors are retried with a backoff for that caller
+    alone, without holding a slot while it waits.
+    """
+
+    def __init__(self, size):
+        self.semaphore = threading.BoundedSemaphore(size)
+
+    def call(self, fn, model, retries=MAX_RETRIES):
+        for attempt in range(retries + 1):
+            with self.semaphore:
+                try:
+                    return fn()
+                except RateLimitError as e:
+                    if attempt == retries:
+                        raise
+                    RETRIES.inc(target='openai')
+                    pause_openai(model, _retry_after(e) or 2 ** attempt)
+                    continue
+                except TRANSIENT_ERRORS:
+                    if attempt == retries:
+                        raise
+                    RETRIES.inc(target='openai')
+            time.sleep(2 ** attempt)
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+_slots = None
+_slots_lock = threading.Lock()
+
+def _get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = RateLimitedSlots(config.get('synthesis', 'map_workers'))
+        return _slots
+
+def summary_key(arxiv_id, cfg=config):
+    params = {
+        'kind': 'paper_summary',
+        'arxiv_id': arxiv_id,
+        'model': cfg.get('llm', 'model'),
+        'temperature': cfg.get('llm', 'temperature'),
+        'prompt_version': SUMMARY_PROMPT_VERSION
+    }
+    return cache_key(params, '')
+
+def _doc_text(doc):
+    return doc.page_content if hasattr(doc, 'page_content') else doc['page_content']
+
+def summarize_paper(paper, indexer, cfg=config):
+    """Summarize one indexed paper from its most relevant chunks, cached by arXiv ID."""
+    metadata = paper['metadata']
+    key = summary_key(metadata['arxiv_id'], cfg)
+    summary = lookup(key)
+    if summary is not None:
+        return summary
+
+    top_k = cfg.get('synthesis', 'summary_chunks')
+    relevant_docs = indexer.retrieve(SUMMARY_QUERY, top_k, [metadata['arxiv_id']])
+    context = "\n\n".join([_doc_text(doc) for doc in relevant_docs])
 
-def summarize_paper(text, metadata):
-    chunk_size = config.get('indexer', 'chunk_size')
-    chunk_overlap = config.get('indexer', 'chunk_overlap')
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
-    )
-    chunks = text_splitter.split_text(text)
-    
-    embedding_model = config.get('embeddings', 'model')
-    embeddings = OpenAIEmbeddings(model=embedding_model)
-    vectorstore = Chroma.from_texts(
-        texts=chunks,
-        embedding=embeddings,
-        persist_directory="chroma_db"
-    )
-    
-    model_name = config.get('llm', 'model')
-    temperature = config.get('llm', 'temperature')
-    llm = ChatOpenAI(model=model_name, temperature=temperature)
-    
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    relevant_docs = retriever.invoke(f"Summarize the paper titled '{metadata['title']}'")
-    
-    context = "\n\n".join([doc.page_content for doc in relevant_docs])
-    
     prompt = f"""Use the following context to create a concise summary of the research paper.
 Include: main objective, methodology, key findings, and conclusion.
-Keep it brief and clear, suitable for a 1-2 page summary document.
+Keep it brief and clear, around 150 words.
 
 Context: {context}
 
 Paper Title: {metadata['title']}
 
 Summary:"""
-    
-    response = llm.invoke(prompt)
-    return response.content
+
+    # Rate limits and transient errors are retried by the shared slots instead of the SDK
+    model = cfg.get('llm', 'model')
+    llm = get_chat_model(model, cfg.get('llm', 'temperature'), max_retries=0)
+
+    def invoke():
+        throttle_openai(model, [prompt])
+        message = llm.invoke(prompt)
+        record_usage(model, prompt, message.content, getattr(message, 'usage_metadata', None))
+        return message.content
+
+    with span('summarize', log=False):
+        summary = _get_slots().call(invoke, model)
+    store(key, summary)
+    return summary
+
+def summarize_papers(papers_data, indexer, cfg=config, warnings=None):
+    """Map step: per-paper summaries, computed concurrently and returned in input order.
+
+    A paper whose summary cannot be generated falls back to its opening text
+    so one failure does not sink the report. The fallback is never cached as
+    the paper's summary, and a message for it is appended to ``warnings``.
+    """
+    def summarize(paper):
+        try:
+            return summarize_paper(paper, indexer, cfg)
+        except Exception as e:
+            message = f"Summary failed for {paper['metadata']['arxiv_id']}: {e}"
+            log_warning(message)
+            if warnings is not None:
+                warnings.append(message)
+            return paper['text'][:cfg.get('indexer', 'chunk_size')]
+
+    if not papers_data:
+        return []
+    # Concurrency is process-wide, so it always comes from the base config
+    workers = min(config.get('synthesis', 'map_workers'), len(papers_data))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary') as pool:
+        return list(pool.map(summarize, papers_data))
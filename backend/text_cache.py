@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import os
+import threading
+from .config_loader import config
+from .disk import evict_lru
+from .metrics import cache_result
+
+CACHE_DIR = "data/text_cache"
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def hash_file(path):
+    """SHA-256 of a file's contents, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _entry_path(content_hash, version):
+    return os.path.join(CACHE_DIR, f"{content_hash}.v{version}.txt.gz")
+
+def get(content_hash, version):
+    """Return cached text for a PDF hash and extractor version, or None."""
+    path = _entry_path(content_hash, version)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            text = f.read()
+    except (FileNotFoundError, OSError, EOFError):
+        with _lock:
+            _stats['misses'] += 1
+        cache_result('text', False)
+        return None
+
+    # The modification time doubles as the LRU timestamp
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    with _lock:
+        _stats['hits'] += 1
+    cache_result('text', True)
+    return text
+
+def put(content_hash, version, text):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(content_hash, version)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    _evict()
+
+def _evict():
+    max_bytes = config.get('cache', 'text_cache_mb') * 1024 * 1024
+    with _lock:
+        _stats['evictions'] += evict_lru(CACHE_DIR, max_bytes, ('.txt.gz',))
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    lookups = result['hits'] + result['misses']
+    result['hit_rate'] = result['hits'] / lookups if lookups else 0.0
+    return result
@@ -0,0 +1,84 @@
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from .scoring import top_k_indices
+
+class HashedTfidfIndex:
+    """TF-IDF index that never refits.
+
+    Terms are hashed into a fixed feature space, so new documents are only
+    transformed and appended. Document frequencies are kept as running
+    counts, which keeps IDF incremental. IDF is smoothed like scikit-learn's
+    TfidfVectorizer. Documents are scored by cosine similarity, using only
+    the sparse nonzero matches of each query.
+    """
+
+    def __init__(self, n_features=2 ** 18):
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, alternate_sign=False, norm=None
+        )
+        self.term_freqs = sparse.csr_matrix((0, n_features), dtype=np.float64)
+        self.doc_freqs = np.zeros(n_features, dtype=np.int64)
+        self.idf = np.ones(n_features, dtype=np.float64)
+        self.doc_norms = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        return self.term_freqs.shape[0]
+
+    def add_documents(self, texts):
+        self.add_rows(self.transform(texts))
+
+    def transform(self, texts):
+        """Hashed term-frequency rows for texts; needs no index state."""
+        return self.vectorizer.transform(texts).tocsr()
+
+    def add_rows(self, new_rows):
+        """Append rows from transform and refresh the statistics."""
+        self.doc_freqs += np.bincount(new_rows.indices, minlength=len(self.doc_freqs))
+        self.term_freqs = sparse.vstack([self.term_freqs, new_rows], format='csr')
+        self._update_statistics()
+
+    def keep_rows(self, rows):
+        """Keep only the given documents, renumbered in that order."""
+        self.term_freqs = self.term_freqs[np.asarray(rows, dtype=np.int64)]
+        self.doc_freqs = np.bincount(self.term_freqs.indices, minlength=len(self.doc_freqs)).astype(np.int64)
+        self._update_statistics()
+
+    def _update_statistics(self):
+        n_docs = len(self)
+        self.idf = np.log((1 + n_docs) / (1 + self.doc_freqs)) + 1
+        squared = self.term_freqs.multiply(self.term_freqs) @ (self.idf ** 2)
+        self.doc_norms = np.sqrt(np.asarray(squared).ravel())
+        self.doc_norms[self.doc_norms == 0] = 1.0
+
+    def score_sparse(self, queries, rows=None):
+        """CSR (n_queries, n_docs) cosine scores holding only matching documents.
+
+        With ``rows``, only those documents are scored, and column j holds
+        the score of document rows[j].
+        """
+        term_freqs = self.term_freqs
+        doc_norms = self.doc_norms
+        if rows is not None:
+            term_freqs = term_freqs[rows]
+            doc_norms = doc_norms[rows]
+        query_vecs = self.vectorizer.transform(queries).multiply(self.idf).tocsr()
+        query_norms = np.sqrt(np.asarray(query_vecs.multiply(query_vecs).sum(axis=1)).ravel())
+        query_norms[query_norms == 0] = 1.0
+
+        # Doc weights are tf * idf, so fold a second idf factor into the query side
+        weighted = sparse.diags(1 / query_norms) @ query_vecs.multiply(self.idf).tocsr()
+        scores = (weighted @ term_freqs.T).tocsr()
+        scores.data /= doc_norms[scores.indices]
+        return scores
+
+    def top_k(self, query, k, rows=None):
+        """Doc ids of the k best matches for a query, among rows when given, without densifying scores."""
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+        if not len(self) or (rows is not None and not len(rows)):
+            return np.zeros(0, dtype=np.int64)
+        row = self.score_sparse([query], rows)
+        row.sort_indices()
+        doc_ids = row.indices if rows is None else rows[row.indices]
+        return doc_ids[top_k_indices(row.data, k)]
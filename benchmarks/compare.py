@@ -0,0 +1,50 @@
+"""Compare two benchmark JSON files stage by stage.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 15
+
+Exits with status 1 when any stage's mean latency regressed by more than
+the threshold percentage.
+"""
+import argparse
+import json
+import sys
+
+def compare(baseline, candidate, threshold):
+    rows = []
+    regressions = []
+    for name, new in candidate['stages'].items():
+        old = baseline['stages'].get(name)
+        if old is None:
+            rows.append((name, None, new['mean_ms'], None))
+            continue
+        change = 100 * (new['mean_ms'] - old['mean_ms']) / old['mean_ms'] if old['mean_ms'] else 0.0
+        rows.append((name, old['mean_ms'], new['mean_ms'], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{'stage':<24}{'baseline ms':>14}{'candidate ms':>14}{'change':>10}")
+    for name, old, new, change in rows:
+        old_text = f"{old:.3f}" if old is not None else "-"
+        change_text = f"{change:+.1f}%" if change is not None else "new"
+        flag = "  <-- regression" if name in regressions else ""
+        print(f"{name:<24}{old_text:>14}{new:>14.3f}{change_text:>10}{flag}")
+    print(f"peak RSS: {baseline.get('peak_rss_mb')} MB -> {candidate.get('peak_rss_mb')} MB")
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
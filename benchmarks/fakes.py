@@ -0,0 +1,212 @@
+"""Offline stand-ins for arXiv, PDF downloads, OpenAI models and pdflatex."""
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from backend import clients
+from backend.lexical import tokenize
+
+TOPICS = {
+    'transformers': "attention transformer encoder decoder self-attention heads layers tokens sequence pretraining",
+    'diffusion': "diffusion denoising score noise schedule sampler image generation latent guidance",
+    'reinforcement': "policy reward agent environment value function exploration actor critic return",
+    'graphs': "graph node edge message passing neighborhood embedding convolution spectral pooling",
+    'retrieval': "retrieval index query document ranking dense sparse passage recall rerank",
+}
+FILLER = "method results experiments baseline dataset evaluation model training analysis performance".split()
+
+def _sentence(rng, topic_words):
+    words = [rng.choice(topic_words if rng.random() < 0.6 else FILLER) for _ in range(rng.randint(8, 16))]
+    return " ".join(words).capitalize() + "."
+
+def make_corpus(root, n_papers=40, pages=6, seed=7):
+    """Write n_papers fixture PDFs under root and return their search-result dicts."""
+    rng = random.Random(seed)
+    pdf_dir = os.path.join(root, 'fixture_pdfs')
+    os.makedirs(pdf_dir, exist_ok=True)
+    names = list(TOPICS)
+    papers = []
+    for i in range(n_papers):
+        topic = names[i % len(names)]
+        topic_words = TOPICS[topic].split()
+        arxiv_id = f"2401.{i:05d}v1"
+        title = f"{topic.capitalize()} study {i}: " + " ".join(rng.sample(topic_words, 3))
+        summary = " ".join(_sentence(rng, topic_words) for _ in range(5))
+        pdf_path = os.path.join(pdf_dir, f"{arxiv_id}.pdf")
+        _write_pdf(pdf_path, title, rng, topic_words, pages)
+        papers.append({
+            'arxiv_id': arxiv_id,
+            'title': title,
+            'authors': [f"Author {i}-{k}" for k in range(rng.randint(1, 5))],
+            'published': f"2024-01-{1 + i % 28:02d}",
+            'summary': summary,
+            'pdf_url': f"file://{os.path.abspath(pdf_path)}",
+            'topic': topic
+        })
+    return papers
+
+def _write_pdf(path, title, rng, topic_words, pages):
+    pdf = canvas.Canvas(path, pagesize=letter)
+    for page in range(pages):
+        text = pdf.beginText(54, 740)
+        text.setFont("Helvetica", 9)
+        if page == 0:
+            text.textLine(title)
+            text.textLine("Abstract")
+        if page == pages - 1:
+            text.textLine("References")
+        for _ in range(60):
+            text.textLine(_sentence(rng, topic_words))
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+
+class _Author:
+    def __init__(self, name):
+        self.name = name
+
+class FakeResult:
+    """The subset of arxiv.Result that paper_from_result reads."""
+
+    def __init__(self, paper):
+        self.paper = paper
+        self.title = paper['title']
+        self.authors = [_Author(name) for name in paper['authors']]
+        self.published = datetime.strptime(paper['published'], "%Y-%m-%d")
+        self.summary = paper['summary']
+        self.pdf_url = paper['pdf_url']
+
+    def get_short_id(self):
+        return self.paper['arxiv_id']
+
+class FakeArxivClient:
+    """Answers arxiv.Search queries from the fixture corpus by term overlap."""
+
+    def __init__(self, papers):
+        self.papers = papers
+        self.by_id = {p['arxiv_id'].split('v')[0]: p for p in papers}
+
+    def results(self, search):
+        if search.id_list:
+            found = [self.by_id.get(arxiv_id.split('v')[0]) for arxiv_id in search.id_list]
+            return [FakeResult(p) for p in found if p is not None]
+        terms = set(tokenize(search.query))
+        scored = sorted(
+            self.papers,
+            key=lambda p: -len(terms & set(tokenize(f"{p['title']} {p['summary']}")))
+        )
+        return [FakeResult(p) for p in scored[:search.max_results]]
+
+class _FileResponse:
+    def __init__(self, path):
+        self.path = path
+        self.status_code = 200 if os.path.exists(path) else 404
+        self.headers = {'Content-Length': str(os.path.getsize(path))} if self.status_code == 200 else {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if not os.path.exists(self.path):
+            raise OSError(f"Fixture PDF missing: {self.path}")
+
+    def iter_content(self, chunk_size=65536):
+        with open(self.path, 'rb') as f:
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    return
+                yield block
+
+class FakeSession:
+    """Serves file:// URLs like a requests.Session serving PDFs."""
+
+    def get(self, url, stream=False, timeout=None, **kwargs):
+        return _FileResponse(url[len("file://"):])
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words embeddings."""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode('utf-8')).digest()
+            vector[int.from_bytes(digest[:4], 'little') % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+class FakeChatModel:
+    """Deterministic replies shaped like the pipeline's three prompt kinds."""
+
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+
+    def _reply(self, prompt):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if prompt.startswith("You are a research paper query optimizer"):
+            user_input = prompt.split("User Input:", 1)[1].split("\n", 1)[0].strip()
+            return json.dumps({
+                "search_query": user_input,
+                "themes": ["methods", "evaluation"],
+                "structure": ["Introduction", "Methods", "Results", "Conclusion"],
+                "special_requirements": ""
+            })
+        if prompt.startswith("Create a comprehensive research report"):
+            n_papers = len(re.findall(r'^Paper \d+:', prompt, re.MULTILINE))
+            cites = ",".join(f"paper{i}" for i in range(1, n_papers + 1))
+            sections = "\n".join(
+                f"\\section{{Section {i}}}\nFindings are compared across studies \\cite{{{cites}}}.\n"
+                for i in range(1, 5)
+            )
+            return f"\\begin{{abstract}}\nA synthetic report.\n\\end{{abstract}}\n{sections}"
+        return "Objective, method, findings and conclusion of the paper in brief."
+
+    def invoke(self, prompt):
+        return _Message(self._reply(prompt))
+
+    def stream(self, prompt):
+        reply = self._reply(prompt)
+        for start in range(0, len(reply), 16):
+            yield _Message(reply[start:start + 16])
+
+def install(papers, llm_latency_s=0.0):
+    """Point the client registry at the offline stand-ins."""
+    clients.set_factory('arxiv', lambda: FakeArxivClient(papers))
+    clients.set_factory('http', FakeSession)
+    clients.set_factory('chat', lambda model, temperature, max_retries: FakeChatModel(llm_latency_s))
+    clients.set_factory('embeddings', lambda model: FakeEmbeddings())
+
+def install_fake_pdflatex(bin_dir):
+    """Put a stand-in pdflatex first on PATH; it writes a stub PDF and aux file."""
+    os.makedirs(bin_dir, exist_ok=True)
+    script = os.path.join(bin_dir, 'pdflatex')
+    fake = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_pdflatex.py')
+    with open(script, 'w') as f:
+        f.write(f"#!/bin/sh\nexec \"{sys.executable}\" \"{fake}\" \"$@\"\n")
+    os.chmod(script, 0o755)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
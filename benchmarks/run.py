@@ -0,0 +1,242 @@
+"""End-to-end pipeline benchmark against offline stand-ins.
+
+Runs every pipeline stage on a generated fixture corpus with fake arXiv,
+download, embedding and chat clients, and writes per-stage latency,
+throughput and memory as JSON:
+
+    python -m benchmarks.run --papers 40 --output bench.json
+    python -m benchmarks.compare old.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+INDEXER_TYPES = ['vector', 'bm25', 'tfidf', 'inverted', 'hybrid']
+RETRIEVAL_QUERIES = [
+    "attention heads in transformer layers",
+    "denoising diffusion samplers",
+    "policy gradient exploration",
+    "message passing on graphs",
+    "dense passage retrieval and reranking",
+]
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def _rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class StageRecorder:
+    """Collects per-call durations, item counts and memory for named stages."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextmanager
+    def measure(self, name, items=1, nbytes=0):
+        stage = self.stages.setdefault(name, {'durations': [], 'items': 0, 'bytes': 0, 'py_peak': 0})
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        yield stage
+        stage['durations'].append(time.perf_counter() - started)
+        stage['items'] += items
+        stage['bytes'] += nbytes
+        if self.trace_memory:
+            stage['py_peak'] = max(stage['py_peak'], tracemalloc.get_traced_memory()[1])
+        stage['rss_mb'] = _rss_mb()
+
+    def summary(self):
+        results = {}
+        for name, stage in self.stages.items():
+            durations = stage['durations']
+            total = sum(durations)
+            entry = {
+                'calls': len(durations),
+                'total_s': round(total, 4),
+                'mean_ms': round(1000 * total / len(durations), 3),
+                'p50_ms': round(1000 * _percentile(durations, 0.5), 3),
+                'p95_ms': round(1000 * _percentile(durations, 0.95), 3),
+                'items': stage['items'],
+                'items_per_s': round(stage['items'] / total, 2) if total else None,
+                'peak_rss_mb': round(stage['rss_mb'], 1)
+            }
+            if stage['bytes']:
+                entry['mb_per_s'] = round(stage['bytes'] / (1024 * 1024) / total, 2) if total else None
+            if self.trace_memory:
+                entry['py_peak_mb'] = round(stage['py_peak'] / (1024 * 1024), 2)
+            results[name] = entry
+        return results
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', '-C', REPO_ROOT, 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--papers', type=int, default=40, help="Fixture papers in the corpus")
+    parser.add_argument('--pages', type=int, default=6, help="Pages per fixture PDF")
+    parser.add_argument('--top', type=int, default=12, help="Papers kept after ranking")
+    parser.add_argument('--query', default="transformer attention heads and layers")
+    parser.add_argument('--indexers', default=','.join(INDEXER_TYPES), help="Comma-separated indexer types")
+    parser.add_argument('--latex', choices=['auto', 'real', 'fake'], default='auto',
+                        help="Use the real pdflatex, the stand-in, or the real one when installed")
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help="Simulated latency per chat call")
+    parser.add_argument('--trace-memory', action='store_true', help="Record Python heap peaks (slows stages)")
+    parser.add_argument('--workdir', help="Directory for caches and outputs (default: a temporary one)")
+    parser.add_argument('--output', help="Write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+def run(args):
+    from backend.config_loader import config
+    from benchmarks import fakes
+
+    # Generous limits so the benchmark measures the pipeline, not the throttles
+    config.set_base({
+        'clients': {'arxiv_interval_s': 0.001, 'download_rps': 100000, 'openai_rpm': 10 ** 7, 'openai_tpm': 10 ** 10},
+        'search': {'max_results': args.papers, 'top_papers': args.top}
+    })
+
+    latex = args.latex
+    if latex == 'auto':
+        latex = 'real' if shutil.which('pdflatex') else 'fake'
+    if latex == 'fake':
+        fakes.install_fake_pdflatex(os.path.join(os.getcwd(), 'bin'))
+
+    papers_fixture = fakes.make_corpus(os.getcwd(), args.papers, args.pages)
+    fakes.install(papers_fixture, args.llm_latency_s)
+
+    from backend.chunk_store import get_chunk_store
+    from backend.extractor import extract_text
+    from backend.fetcher import fetch_paper
+    from backend.indexers import get_indexer
+    from backend.multi_summarizer import summarize_multiple_papers
+    from backend.pipeline import generate_report
+    from backend.ranker import rank_papers
+    from backend.report_generator import generate_report_pdf
+    from backend.searcher import search_papers
+
+    os.makedirs("data/papers", exist_ok=True)
+    os.makedirs("data/outputs", exist_ok=True)
+    recorder = StageRecorder(args.trace_memory)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    with recorder.measure('search_papers') as stage:
+        papers = search_papers(args.query)
+    stage['items'] = len(papers)
+
+    with recorder.measure('rank_papers', items=len(papers)):
+        top_papers = rank_papers(papers, args.query, args.top, ["methods", "evaluation"])
+
+    pdf_paths = []
+    for paper in top_papers:
+        with recorder.measure('fetch_paper') as stage:
+            pdf_path = fetch_paper(paper)
+        stage['bytes'] += os.path.getsize(pdf_path)
+        pdf_paths.append(pdf_path)
+
+    papers_data = []
+    extraction = config.get('extraction')
+    for paper, pdf_path in zip(top_papers, pdf_paths):
+        with recorder.measure('extract_text', nbytes=os.path.getsize(pdf_path)):
+            text, metadata = extract_text(
+                pdf_path, paper,
+                max_pages=extraction['max_pages'] or None,
+                stop_at_references=extraction['stop_at_references'],
+                workers=extraction['page_workers'],
+                parallel_min_pages=extraction['parallel_min_pages']
+            )
+        papers_data.append({'text': text, 'metadata': metadata})
+
+    chunk_size = config.get('indexer', 'chunk_size')
+    chunk_overlap = config.get('indexer', 'chunk_overlap')
+    store = get_chunk_store(chunk_size, chunk_overlap)
+    with recorder.measure('chunk_store', items=len(papers_data)):
+        store.add_papers(papers_data)
+
+    arxiv_ids = [p['metadata']['arxiv_id'] for p in papers_data]
+    for indexer_type in [t.strip() for t in args.indexers.split(',') if t.strip()]:
+        # Hybrid members are built by then, so 'hybrid' indexing measures fusion overhead only
+        with recorder.measure(f'index_{indexer_type}', items=len(papers_data)):
+            indexer = get_indexer(indexer_type, chunk_size, chunk_overlap)
+            indexer.index(papers_data)
+        for query in RETRIEVAL_QUERIES:
+            with recorder.measure(f'retrieve_{indexer_type}'):
+                indexer.retrieve(query, config.get('indexer', 'top_k'), arxiv_ids)
+
+    with recorder.measure('synthesis', items=len(papers_data)):
+        report = summarize_multiple_papers(papers_data, args.query, None)
+
+    # Second build reuses the stashed .aux, so it shows the single-pass path
+    for attempt in ('cold', 'warm'):
+        with recorder.measure('generate_report_pdf'):
+            generate_report_pdf(report, top_papers, args.query, "data/outputs/benchmark_report.pdf")
+
+    with recorder.measure('pipeline_end_to_end'):
+        generate_report({'user_query': "graph message passing and node embeddings"})
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latex': latex,
+            'args': vars(args)
+        },
+        'stages': recorder.summary(),
+        'peak_rss_mb': round(_rss_mb(), 1)
+    }
+    if args.trace_memory:
+        tracemalloc.stop()
+    return results
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.llm_latency_s = args.llm_latency_ms / 1000
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='composer-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        # Pipeline logging goes to stderr so stdout carries only the JSON
+        with redirect_stdout(sys.stderr):
+            results = run(args)
+    finally:
+        os.chdir(previous)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    encoded = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+
+if __name__ == '__main__':
+    main()
@@ -46,7 +46,7 @@ function displayPapers(papers) {
     });
 }
 
-function displayReportPreview(content, topic) {
+function displayReportPreview(content, topic, streaming = false) {
     const preview = document.getElementById('report-preview');
     const titleText = document.getElementById('preview-title-text');
     
@@ -60,12 +60,24 @@ function displayReportPreview(content, topic) {
             <div class="preview-note" style="background: #e8f4fd; padding: 1rem; border-radius: 6px; margin-bottom: 1.5rem; border-left: 4px solid #667eea;">
                 <strong>📄 Preview:</strong> This is a text preview of the generated report. Download the PDF for the full formatted version with proper citations and bibliography.
             </div>
-            <div style="white-space: pre-wrap; font-family: inherit;">${content}</div>
+            <div class="report-body" style="white-space: pre-wrap; font-family: inherit;">${content}</div>
         </div>
     `;
     
-    // Show download button in header
-    document.getElementById('download-btn').classList.remove('hidden');
+    // Show download button in header once the PDF exists
+    if (!streaming) {
+        document.getElementById('download-btn').classList.remove('hidden');
+    }
+}
+
+function appendReportPreview(text, topic) {
+    let body = document.querySelector('#report-preview .report-body');
+    if (!body || !body.dataset.streaming) {
+        displayReportPreview('', topic, true);
+        body = document.querySelector('#report-preview .report-body');
+        body.dataset.streaming = 'true';
+    }
+    body.appendChild(document.createTextNode(text));
 }
 
 function downloadReport() {
@@ -172,6 +184,118 @@ function displayQuerySpec(spec) {
     querySpecDiv.classList.remove('hidden');
 }
 
+const STAGE_LOGS = {
+    query: { started: '🔍 Analyzing query requirements...', done: '✅ Query processed' },
+    search: { started: '🔎 Searching ArXiv for relevant papers...' },
+    rank: { started: '📑 Ranking papers by relevance...' },
+    fetch: { started: '📥 Fetching and extracting papers...', done: '📝 Text extraction complete' },
+    synthesis: { started: '✍️ Indexing papers and generating report with LLM...', done: '✅ Report text generated' },
+    compile: { started: '📄 Compiling LaTeX document...', done: '📚 Bibliography and citations added' }
+};
+
+function logStage(data) {
+    if (data.stage === 'search' && data.status === 'done') {
+        addLog(`✅ Found ${data.count} papers`, 'success');
+        return;
+    }
+    const message = (STAGE_LOGS[data.stage] || {})[data.status];
+    if (message) {
+        addLog(message, data.status === 'done' ? 'success' : 'info');
+    }
+}
+
+function resetGenerateButton(label) {
+    const actionBtn = document.getElementById('action-btn');
+    actionBtn.disabled = false;
+    actionBtn.innerHTML = label;
+}
+
+function finishReport(data) {
+    currentFilename = data.filename;
+    
+    if (data.warnings && data.warnings.length > 0) {
+        data.warnings.forEach(warning => {
+            addLog(`⚠️ ${warning}`, 'warning');
+        });
+    }
+    
+    if (data.report_preview) {
+        displayReportPreview(data.report_preview, currentQuerySpec.search_query);
+    }
+    
+    addLog('✅ PDF generated successfully!', 'success');
+    addLog(`💾 Saved as: ${data.filename}`, 'success');
+    addLog('🎉 Report generation complete!', 'success');
+    showStatus('Report generated successfully!', 'success');
+    
+    // Reset button to analyze state for new query
+    const actionBtn = document.getElementById('action-btn');
+    actionBtn.dataset.state = 'analyze';
+    resetGenerateButton('New Query');
+}
+
+function failReport(detail) {
+    addLog(`❌ Error: ${detail}`, 'error');
+    showStatus('Error: ' + detail, 'error');
+    // Keep button in generate state to allow retry
+    resetGenerateButton('Retry Generation');
+}
+
+function followJob(jobId) {
+    let totalPapers = 0;
+    let lastEventId = -1;
+    const events = new EventSource(`/api/jobs/${jobId}/events`);
+    
+    // A reconnect resumes after Last-Event-ID, but never apply an event twice
+    const on = (name, handler) => events.addEventListener(name, (e) => {
+        const id = parseInt(e.lastEventId, 10);
+        if (!Number.isNaN(id)) {
+            if (id <= lastEventId) return;
+            lastEventId = id;
+        }
+        handler(e);
+    });
+    
+    on('stage', (e) => logStage(JSON.parse(e.data)));
+    
+    on('papers', (e) => {
+        const data = JSON.parse(e.data);
+        totalPapers = data.papers.length;
+        data.papers.forEach((paper, index) => addPaperToList(paper, index + 1));
+    });
+    
+    on('paper', (e) => {
+        const paper = JSON.parse(e.data);
+        const position = `[${paper.index}/${totalPapers}]`;
+        if (paper.status === 'success') {
+            addLog(`✓ ${position} ${paper.title.substring(0, 60)}...`, 'success');
+        } else {
+            addLog(`✗ ${position} Failed: ${paper.title.substring(0, 50)}...`, 'error');
+        }
+    });
+    
+    on('preview', (e) => {
+        appendReportPreview(JSON.parse(e.data).text, currentQuerySpec.search_query);
+    });
+    
+    on('result', (e) => {
+        events.close();
+        finishReport(JSON.parse(e.data));
+    });
+    
+    on('failed', (e) => {
+        events.close();
+        failReport(JSON.parse(e.data).detail);
+    });
+    
+    events.onerror = () => {
+        // The browser retries dropped streams on its own; give up only once the job is gone
+        if (events.readyState === EventSource.CLOSED) {
+            failReport('Lost connection to the report job');
+        }
+    };
+}
+
 async function generateReport() {
     if (!currentQuerySpec) {
         showStatus('Please analyze your query first', 'error');
@@ -184,8 +308,6 @@ async function generateReport() {
     actionBtn.innerHTML = '<span class="spinner"></span> Generating...';
     
     showStatus('Searching and processing papers...', 'info');
-    
-    addLog('🔎 Searching ArXiv for relevant papers...', 'info');
     addLog(`📊 Query: "${currentQuerySpec.search_query}"`, 'info');
     
     try {
@@ -198,7 +320,7 @@ async function generateReport() {
         addLog(`⚙️ Using ${llmModel} with ${embeddingModel}`, 'info');
         addLog(`🔧 Indexer: ${indexerType}, Top papers: ${topPapers}`, 'info');
         
-        const response = await fetch('/api/generate-advanced', {
+        const response = await fetch('/api/jobs', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -206,85 +328,23 @@ async function generateReport() {
                 llm_model: llmModel,
                 embedding_model: embeddingModel,
                 indexer_type: indexerType,
-                top_papers: topPapers
+                top_papers: topPapers,
+                query_spec: currentQuerySpec
             })
         });
         
         const data = await response.json();
         
         if (response.ok) {
-            currentFilename = data.filename;
-            
-            // Log search results
-            addLog(`✅ Found ${data.papers.length} relevant papers`, 'success');
-            addLog('📑 Ranking papers by relevance...', 'info');
-            
-            // Display papers incrementally with progress
-            if (data.processed_papers) {
-                addLog(`📥 Fetching and processing ${data.processed_papers.length} papers...`, 'info');
-                
-                // Simulate incremental display (since we get all at once from backend)
-                data.papers.forEach((paper, index) => {
-                    setTimeout(() => {
-                        // Update papers list incrementally
-                        addPaperToList(paper, index + 1);
-                        
-                        // Log each paper fetch
-                        const processedInfo = data.processed_papers[index];
-                        if (processedInfo && processedInfo.status === 'success') {
-                            addLog(`✓ [${index + 1}/${data.papers.length}] ${paper.title.substring(0, 60)}...`, 'success');
-                        } else if (processedInfo && processedInfo.status === 'error') {
-                            addLog(`✗ [${index + 1}/${data.papers.length}] Failed: ${paper.title.substring(0, 50)}...`, 'error');
-                        }
-                    }, index * 100); // Stagger the display
-                });
-            } else {
-                displayPapers(data.papers);
-            }
-            
-            // Wait for paper display to complete, then continue
-            setTimeout(() => {
-                addLog('📝 Extracting text from PDFs...', 'info');
-                addLog(`🔍 Creating ${indexerType} index...`, 'info');
-                addLog('🧠 Chunking documents for RAG...', 'info');
-                
-                if (data.warnings && data.warnings.length > 0) {
-                    data.warnings.forEach(warning => {
-                        addLog(`⚠️ ${warning}`, 'warning');
-                    });
-                }
-                
-                addLog('✍️ Generating report with LLM...', 'info');
-                addLog('📄 Compiling LaTeX document...', 'info');
-                addLog('📚 Adding bibliography and citations...', 'info');
-                
-                // Display report preview
-                if (data.report_preview) {
-                    displayReportPreview(data.report_preview, currentQuerySpec.search_query);
-                }
-                
-                addLog('✅ PDF generated successfully!', 'success');
-                addLog(`💾 Saved as: ${data.filename}`, 'success');
-                addLog('🎉 Report generation complete!', 'success');
-                showStatus('Report generated successfully!', 'success');
-                
-                // Reset button to analyze state for new query
-                actionBtn.dataset.state = 'analyze';
-                actionBtn.innerHTML = 'New Query';
-            }, data.papers.length * 100 + 500);
+            addLog('⏳ Report job queued', 'info');
+            followJob(data.job_id);
+        } else if (response.status === 429) {
+            failReport('The server is busy with other reports, please try again shortly');
         } else {
-            addLog(`❌ Error: ${data.detail}`, 'error');
-            showStatus('Error: ' + data.detail, 'error');
-            // Keep button in generate state to allow retry
-            actionBtn.innerHTML = 'Retry Generation';
+            failReport(data.detail);
         }
     } catch (error) {
-        addLog(`❌ Error: ${error.message}`, 'error');
-        showStatus('Error: ' + error.message, 'error');
-        // Keep button in generate state to allow retry
-        actionBtn.innerHTML = 'Retry Generation';
-    } finally {
-        actionBtn.disabled = false;
+        failReport(error.message);
     }
 }
 